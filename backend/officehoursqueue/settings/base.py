@@ -61,7 +61,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "accounts.middleware.OAuth2TokenMiddleware",
+    "ohq.middleware.OAuth2TokenMiddleware",
 ]
 
 ROOT_URLCONF = "officehoursqueue.urls"
@@ -93,6 +93,22 @@ DATABASES = {
     )
 }
 
+# Statistics, search and exports read from a replica when one is configured, see ohq.db.routers
+REPLICA_DATABASE_URL = os.environ.get("REPLICA_DATABASE_URL")
+if REPLICA_DATABASE_URL:
+    DATABASES["replica"] = dj_database_url.parse(REPLICA_DATABASE_URL)
+    # Tests read from the test database instead
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+# Connections to PostgreSQL are returned to a pool of this size per process when Django closes
+# them, see ohq.db
+for database in DATABASES.values():
+    if database["ENGINE"].startswith("django.db.backends.postgresql"):
+        database["ENGINE"] = "ohq.db"
+        database["POOL"] = {"SIZE": int(os.environ.get("DATABASE_POOL_SIZE", 10))}
+
+DATABASE_ROUTERS = ["ohq.db.routers.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -137,7 +153,7 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 # Rest Framework
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": (
-        "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
+        "ohq.renderers.CamelCaseJSONRenderer",
         "djangorestframework_camel_case.render.CamelCaseBrowsableAPIRenderer",
         # Any other renders
     ),
@@ -184,3 +200,7 @@ MESSAGE_BROKER_URL = REDIS_URL
 # Default to in-memory Channel Layer for dev and CI.
 
 CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# Default to local-memory cache for dev and CI.
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
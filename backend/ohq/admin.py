@@ -7,6 +7,7 @@ from ohq.models import (
     MembershipInvite,
     Profile,
     Question,
+    QuestionEvent,
     Queue,
     QueueStatistic,
     Semester,
@@ -19,6 +20,7 @@ admin.site.register(Membership)
 admin.site.register(MembershipInvite)
 admin.site.register(Profile)
 admin.site.register(Question)
+admin.site.register(QuestionEvent)
 admin.site.register(Queue)
 admin.site.register(Semester)
 admin.site.register(QueueStatistic)
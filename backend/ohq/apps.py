@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class OhqConfig(AppConfig):
     name = "ohq"
+
+    def ready(self):
+        # Register cache invalidation and realtime signal handlers
+        import ohq.cache  # noqa: F401
+        import ohq.realtime  # noqa: F401
@@ -0,0 +1,118 @@
+import functools
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import get_random_string
+from django.utils.http import quote_etag
+
+from ohq.models import Announcement, Queue, Tag
+
+
+# The staff question list is keyed by the question stamp of its queue, so it never has to be
+# invalidated. The timeout only limits how long changes to e.g. user names take to show up.
+QUESTION_LIST_TIMEOUT = 60 * 10
+
+
+def course_tags_key(course_id):
+    return f"ohq:course:{course_id}:tags"
+
+
+def course_announcements_key(course_id):
+    return f"ohq:course:{course_id}:announcements"
+
+
+def question_list_key(queue_id, stamp):
+    return f"ohq:queue:{queue_id}:questions:{stamp}"
+
+
+def stamp_key(name):
+    return f"ohq:stamp:{name}"
+
+
+def get_stamps(*names):
+    """
+    Get a single string combining the version stamps with the given names, e.g.
+    "course:1:queues". A stamp is a random string that changes whenever the resource it
+    describes does, so comparing stamps doesn't need the database.
+    """
+
+    keys = [stamp_key(name) for name in names]
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            # add() so that concurrent requests agree on the new stamp
+            cache.add(key, get_random_string(12), None)
+            stamps[key] = cache.get(key)
+    return "-".join(stamps[key] for key in keys)
+
+
+def bump_stamps(*names):
+    """
+    Change the version stamps with the given names once the current transaction commits, so
+    that a new stamp is never sent along with data from before the change.
+    """
+
+    transaction.on_commit(lambda: cache.delete_many([stamp_key(name) for name in names]))
+
+
+def conditional(etag_func):
+    """
+    Decorator for viewset methods that adds an ETag computed by etag_func(view, request) to
+    responses, and responds with 304 Not Modified if the ETag matches the request's
+    If-None-Match header. etag_func should be cheap, e.g. built from get_stamps(),
+    and be computed before the response so that it is never newer than the response data.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = quote_etag(etag_func(self, request))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    response["ETag"] = etag
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_course_tags(course_id):
+    """
+    Get the tags of a course as a list of {"id", "name"} dictionaries, ordered by id.
+    Tags rarely change, so they are cached until a tag in the course is saved or deleted.
+    """
+
+    key = course_tags_key(course_id)
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(Tag.objects.filter(course=course_id).order_by("id").values("id", "name"))
+        cache.set(key, tags, None)
+    return tags
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_course_tags(sender, instance, **kwargs):
+    # Delete again after commit in case the old tags were cached in the meantime
+    key = course_tags_key(instance.course_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver([post_save, post_delete], sender=Queue)
+def bump_course_queues(sender, instance, **kwargs):
+    bump_stamps(f"course:{instance.course_id}:queues")
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def invalidate_course_announcements(sender, instance, **kwargs):
+    # Delete again after commit in case the old announcements were cached in the meantime
+    key = course_announcements_key(instance.course_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    bump_stamps(f"course:{instance.course_id}:announcements")
@@ -0,0 +1,188 @@
+import collections
+import functools
+import os
+import threading
+import time
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+
+# Connections idle for longer than this are checked with a query before they are reused, since
+# the server or a proxy may have dropped them in the meantime
+HEALTH_CHECK_AFTER = 30
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    A pool of at most size connections to one database. Threads that need a connection while
+    all of them are in use wait up to timeout seconds for one to be returned.
+    """
+
+    def __init__(self, size, timeout, max_idle):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = collections.deque()
+        self.lock = threading.Lock()
+
+    def get(self, connect):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise base.Database.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a pooled database connection"
+            )
+        try:
+            while True:
+                with self.lock:
+                    if not self.idle:
+                        break
+                    # The most recently used connection is the least likely to have been dropped
+                    connection, returned = self.idle.pop()
+                idle_time = time.monotonic() - returned
+                if idle_time < self.max_idle and self.is_healthy(connection, idle_time):
+                    return connection
+                self.discard(connection)
+            return connect()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def put(self, connection):
+        try:
+            if not connection.closed:
+                status = connection.get_transaction_status()
+                if status in [
+                    extensions.TRANSACTION_STATUS_INTRANS,
+                    extensions.TRANSACTION_STATUS_INERROR,
+                ]:
+                    connection.rollback()
+                    status = connection.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_IDLE:
+                    self.reset(connection)
+                    with self.lock:
+                        self.idle.append((connection, time.monotonic()))
+                    return
+            self.discard(connection)
+        except base.Database.Error:
+            self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def reset(self, connection):
+        """
+        Reset the session state of a connection, e.g. temporary tables, SET parameters, prepared
+        statements and advisory locks, so that it doesn't leak to the next user of the connection.
+        """
+
+        # DISCARD ALL can't run in a transaction block
+        autocommit = connection.autocommit
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("DISCARD ALL")
+        connection.autocommit = autocommit
+
+    def is_healthy(self, connection, idle_time):
+        if connection.closed:
+            return False
+        if idle_time < HEALTH_CHECK_AFTER:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except base.Database.Error:
+            return False
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except base.Database.Error:
+            pass
+
+    def clear(self):
+        """
+        Close the idle connections. Connections that are in use are still returned to the pool.
+        """
+
+        with self.lock:
+            idle, self.idle = self.idle, collections.deque()
+        for connection, returned in idle:
+            self.discard(connection)
+
+
+def close_pools(database=None):
+    """
+    Close the idle connections of every pool, or of the pools for the given database name.
+    """
+
+    with pools_lock:
+        matching = [
+            pool
+            for (pid, alias, params), pool in pools.items()
+            if database is None or dict(params).get("database") == database
+        ]
+    for pool in matching:
+        pool.clear()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections to the test database would prevent dropping it
+        close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that returns connections to a per process pool when Django closes them
+    instead of disconnecting, so that requests don't each pay for connecting to the database and
+    the number of connections is bounded. The pool is configured with the POOL setting of the
+    database, e.g. {"SIZE": 10, "TIMEOUT": 10, "MAX_IDLE": 300}.
+
+    Django closes connections at the end of every request and around every
+    database_sync_to_async call when CONN_MAX_AGE is 0, so connections aren't tied to the
+    threads of the ASGI executors, which would keep one connection open per thread.
+    """
+
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        # Pools are per process since connections can't be shared with forked workers
+        key = (os.getpid(), self.alias, tuple(sorted(conn_params.items())))
+        with pools_lock:
+            if key not in pools:
+                options = self.settings_dict.get("POOL", {})
+                pools[key] = ConnectionPool(
+                    size=options.get("SIZE", 10),
+                    timeout=options.get("TIMEOUT", 10),
+                    max_idle=options.get("MAX_IDLE", 300),
+                )
+            return pools[key]
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            return super().get_new_connection(conn_params)
+
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.get(functools.partial(super().get_new_connection, conn_params))
+        # Set up by the base class when connecting, which doesn't happen for pooled connections
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.alias == NO_DB_ALIAS or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps using the connection object after closing it in a transaction, so
+                # it can't be reused
+                self.connection.close()
+            self.pool.put(self.connection)
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Configured with the REPLICA_DATABASE_URL environment variable
+REPLICA_DB_ALIAS = "replica"
+
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def use_replica():
+    """
+    Send the reads in the block to the replica database if one is configured. Only meant for
+    read-only analytics, which can be a little out of date. Writes still go to the primary.
+    Can also be used as a decorator.
+    """
+
+    token = replica_reads.set(True)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Routes the reads in use_replica blocks to the replica database, and everything else to the
+    primary, so that the live queue endpoints always read their own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if replica_reads.get() and REPLICA_DB_ALIAS in connections.databases:
+            return REPLICA_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # e.g. statistics computed from a queue read from the replica are saved to the primary
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
@@ -1,7 +1,7 @@
 from django.db.models import Q
 from django_filters import rest_framework as filters
 
-from ohq.models import Question, QueueStatistic
+from ohq.models import Question, QuestionEvent, QueueStatistic
 
 
 class QuestionSearchFilter(filters.FilterSet):
@@ -27,3 +27,11 @@ class QueueStatisticFilter(filters.FilterSet):
     class Meta:
         model = QueueStatistic
         fields = ["metric", "date"]
+
+
+class QuestionEventFilter(filters.FilterSet):
+    since = filters.NumberFilter(field_name="id", lookup_expr="gt")
+
+    class Meta:
+        model = QuestionEvent
+        fields = ["since", "question"]
@@ -0,0 +1,88 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from djangorestframework_camel_case import render
+
+from ohq.models import Course, Question, Queue, Semester, Tag
+from ohq.prefetching import prefetch
+from ohq.questions import annotate_positions_window
+from ohq.renderers import CamelCaseJSONRenderer
+from ohq.serializers import QuestionSerializer, serialize_questions
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compares the time taken to serialize a queue's questions with each serializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10000, help="Number of questions")
+
+    def handle(self, *args, **kwargs):
+        count = kwargs["count"]
+        # Nothing created by the benchmark is kept
+        with transaction.atomic():
+            queue = self.create_queue(count)
+            questions = annotate_positions_window(Question.objects.filter(queue=queue)).order_by(
+                "time_asked"
+            )
+
+            start = time.perf_counter()
+            data = QuestionSerializer(prefetch(questions, QuestionSerializer), many=True).data
+            serializer_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            serialize_questions(questions)
+            values_time = time.perf_counter() - start
+
+            # Rendering takes the same time with either serializer
+            start = time.perf_counter()
+            render.CamelCaseJSONRenderer().render(data)
+            base_render_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            CamelCaseJSONRenderer().render(data)
+            render_time = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"QuestionSerializer: {serializer_time:.3f}s for {count} questions")
+        self.stdout.write(f"serialize_questions: {values_time:.3f}s for {count} questions")
+        self.stdout.write(f"Speedup: {serializer_time / values_time:.1f}x")
+        self.stdout.write(
+            f"Rendering: {render_time:.3f}s, {base_render_time:.3f}s with the original renderer"
+        )
+
+    def create_queue(self, count):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        course = Course.objects.create(
+            course_code="BENCH", department="BENCH", course_title="Benchmark", semester=semester
+        )
+        queue = Queue.objects.create(name="Benchmark", course=course)
+        ta = User.objects.create(username="benchmark-ta")
+        users = User.objects.bulk_create(
+            [User(username=f"benchmark-student-{i}") for i in range(count)]
+        )
+        tags = [Tag.objects.create(name=name, course=course) for name in ["hw", "exam"]]
+        questions = Question.objects.bulk_create(
+            [
+                Question(
+                    queue=queue,
+                    asked_by=user,
+                    text=f"Question {i}",
+                    status=Question.STATUS_ACTIVE if i % 10 == 0 else Question.STATUS_ASKED,
+                    responded_to_by=ta if i % 10 == 0 else None,
+                )
+                for i, user in enumerate(users)
+            ]
+        )
+        Question.tags.through.objects.bulk_create(
+            [
+                Question.tags.through(question_id=question.id, tag_id=tags[i % 2].id)
+                for i, question in enumerate(questions)
+            ]
+        )
+        return queue
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from ohq.db.routers import use_replica
 from ohq.models import Question, Queue
 from ohq.statistics import (
     calculate_avg_queue_wait,
@@ -48,4 +49,6 @@ class Command(BaseCommand):
             queues = Queue.objects.filter(archived=False)
             earliest_date = timezone.datetime.today().date() - timezone.timedelta(days=1)
 
-        self.calculate_statistics(queues, earliest_date)
+        # Statistics are computed on the replica and saved to the primary
+        with use_replica():
+            self.calculate_statistics(queues, earliest_date)
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
+from ohq.db.routers import use_replica
 from ohq.models import Queue
 from ohq.statistics import calculate_questions_per_ta_heatmap, calculate_wait_time_heatmap
 
@@ -30,4 +31,6 @@ class Command(BaseCommand):
             yesterday = timezone.datetime.today().date() - timezone.timedelta(days=1)
             weekdays = [(yesterday.weekday() + 1) % 7 + 1]
 
-        self.calculate_statistics(queues, weekdays)
+        # Statistics are computed on the replica and saved to the primary
+        with use_replica():
+            self.calculate_statistics(queues, weekdays)
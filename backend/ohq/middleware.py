@@ -0,0 +1,75 @@
+import hashlib
+
+import requests
+from accounts import middleware
+from accounts.settings import accounts_settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponseForbidden, HttpResponseServerError
+from django.utils import timezone
+
+
+User = get_user_model()
+
+# Tokens are trusted for at most this long after platform validated them, so revoked tokens
+# stop working soon after
+TOKEN_TIMEOUT = 60 * 5
+
+# Tokens platform rejected are rejected without asking it again for this long
+INVALID_TOKEN_TIMEOUT = 60
+INVALID_TOKEN = "invalid"
+
+
+def token_key(token):
+    # Tokens aren't stored in the cache in plain text
+    return f"ohq:token:{hashlib.sha256(token.encode()).hexdigest()}"
+
+
+class OAuth2TokenMiddleware(middleware.OAuth2TokenMiddleware):
+    """
+    OAuth2TokenMiddleware that caches which user each bearer token belongs to until the token
+    expires, and that invalid tokens are invalid, instead of asking platform on every request.
+    """
+
+    def __call__(self, request):
+        authorization = request.META.get("HTTP_AUTHORIZATION")
+        if authorization and " " in authorization:
+            auth_type, token = authorization.split(" ", 1)
+            if auth_type == "Bearer":  # Only validate if Authorization header type is Bearer
+                key = token_key(token)
+                user_id = cache.get(key)
+                if user_id == INVALID_TOKEN:
+                    return HttpResponseForbidden()
+
+                user = User.objects.filter(id=user_id, is_active=True).first() if user_id else None
+                if user is None:
+                    try:
+                        platform_request = requests.post(
+                            url=accounts_settings.PLATFORM_URL + "/accounts/introspect/",
+                            headers={"Authorization": f"Bearer {token}"},
+                            data={"token": token},
+                        )
+                    except requests.exceptions.RequestException:  # Can't connect to platform
+                        return HttpResponseForbidden()
+
+                    if platform_request.status_code != 200:  # Access token is invalid
+                        # Errors on platform's side don't mean that the token is invalid
+                        if platform_request.status_code < 500:
+                            cache.set(key, INVALID_TOKEN, INVALID_TOKEN_TIMEOUT)
+                        return HttpResponseForbidden()
+
+                    json = platform_request.json()
+                    user = auth.authenticate(remote_user=json["user"], tokens=False)
+                    if not user:
+                        return HttpResponseServerError()
+
+                    timeout = TOKEN_TIMEOUT
+                    if "exp" in json:
+                        timeout = min(timeout, int(json["exp"] - timezone.now().timestamp()))
+                    if timeout > 0:
+                        cache.set(key, user.id, timeout)
+
+                request.user = user
+
+        return self.get_response(request)
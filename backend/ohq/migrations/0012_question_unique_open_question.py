@@ -0,0 +1,42 @@
+# Generated by Django 3.1.7 on 2026-10-19 16:01
+
+from django.db import migrations, models
+
+
+def withdraw_duplicate_open_questions(apps, schema_editor):
+    """
+    Only keep the most recent open question for each student in each queue so that the
+    constraint below can be created.
+    """
+
+    Question = apps.get_model("ohq", "Question")
+    open_questions = Question.objects.filter(status__in=["ASKED", "ACTIVE"]).order_by(
+        "queue", "asked_by", "-time_asked"
+    )
+    seen = set()
+    duplicates = []
+    for question in open_questions.only("id", "queue_id", "asked_by_id"):
+        key = (question.queue_id, question.asked_by_id)
+        if key in seen:
+            duplicates.append(question.id)
+        seen.add(key)
+    Question.objects.filter(id__in=duplicates).update(status="WITHDRAWN")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ohq", "0011_merge_20210415_2110"),
+    ]
+
+    operations = [
+        migrations.RunPython(withdraw_duplicate_open_questions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="question",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(status__in=["ASKED", "ACTIVE"]),
+                fields=("queue", "asked_by"),
+                name="unique_open_question",
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 3.1.7 on 2026-10-19 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ohq", "0012_question_unique_open_question"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question", name="version", field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 3.1.7 on 2026-10-19 16:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("ohq", "0013_question_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionEvent",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "from_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("ASKED", "Asked"),
+                            ("WITHDRAWN", "Withdrawn"),
+                            ("ACTIVE", "Active"),
+                            ("REJECTED", "Rejected"),
+                            ("ANSWERED", "Answered"),
+                        ],
+                        max_length=9,
+                        null=True,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        choices=[
+                            ("ASKED", "Asked"),
+                            ("WITHDRAWN", "Withdrawn"),
+                            ("ACTIVE", "Active"),
+                            ("REJECTED", "Rejected"),
+                            ("ANSWERED", "Answered"),
+                        ],
+                        max_length=9,
+                    ),
+                ),
+                ("time", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="question_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="ohq.question",
+                    ),
+                ),
+                (
+                    "queue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_events",
+                        to="ohq.queue",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="questionevent",
+            index=models.Index(fields=["queue", "id"], name="question_event_queue_id"),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.1.7 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Existing questions start at version 1 so that syncing from version 0 returns every existing
+    open question.
+    """
+
+    dependencies = [
+        ("ohq", "0014_questionevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="created_version",
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="modified_version",
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name="question",
+            name="created_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="question",
+            name="modified_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.7 on 2026-10-19 17:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ohq", "0015_question_versions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StudentQueue",
+            fields=[],
+            options={"proxy": True, "indexes": [], "constraints": [],},
+            bases=("ohq.queue",),
+        ),
+    ]
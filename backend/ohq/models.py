@@ -2,6 +2,7 @@ from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.dispatch import receiver
+from django.utils import timezone
 from email_tools.emails import send_email
 from phonenumber_field.modelfields import PhoneNumberField
 
@@ -212,6 +213,16 @@ class Queue(models.Model):
         return f"{self.course}: {self.name}"
 
 
+class StudentQueue(Queue):
+    """
+    A queue from the point of view of one student, i.e. their open question, last question and
+    quota in it. Used for realtime updates of the student queue page.
+    """
+
+    class Meta:
+        proxy = True
+
+
 class Tag(models.Model):
     """
     Tags for a course.
@@ -268,6 +279,48 @@ class Question(models.Model):
     should_send_up_soon_notification = models.BooleanField(default=False)
     tags = models.ManyToManyField(Tag, blank=True)
 
+    # Incremented on every write so that concurrent updates can be detected
+    version = models.PositiveIntegerField(default=0)
+
+    # The ids of the transactions that asked the question and last wrote it, see
+    # ohq.questions.get_question_version
+    created_version = models.PositiveBigIntegerField(default=0)
+    modified_version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # A student can only have one open (asked or active) question per queue
+            models.UniqueConstraint(
+                fields=["queue", "asked_by"],
+                condition=models.Q(status__in=["ASKED", "ACTIVE"]),
+                name="unique_open_question",
+            )
+        ]
+
+
+class QuestionEvent(models.Model):
+    """
+    Append-only log of the status transitions of a question.
+    from_status is empty when the question was asked.
+    """
+
+    question = models.ForeignKey(Question, related_name="events", on_delete=models.CASCADE)
+    queue = models.ForeignKey(Queue, related_name="question_events", on_delete=models.CASCADE)
+    from_status = models.CharField(
+        max_length=9, choices=Question.STATUS_CHOICES, blank=True, null=True
+    )
+    to_status = models.CharField(max_length=9, choices=Question.STATUS_CHOICES)
+    actor = models.ForeignKey(
+        User, related_name="question_events", on_delete=models.SET_NULL, blank=True, null=True
+    )
+    time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["queue", "id"], name="question_event_queue_id")]
+
+    def __str__(self):
+        return f"{self.question}: {self.from_status} -> {self.to_status}"
+
 
 class QueueStatistic(models.Model):
     """
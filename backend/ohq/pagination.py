@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class QuestionSearchPagination(PageNumberPagination):
@@ -7,3 +7,12 @@ class QuestionSearchPagination(PageNumberPagination):
     """
 
     page_size = 20
+
+
+class QuestionEventPagination(CursorPagination):
+    """
+    Pagination for question events, which pages through a queue's events in id order.
+    """
+
+    ordering = "id"
+    page_size = 100
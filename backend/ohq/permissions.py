@@ -1,7 +1,6 @@
-from django.db.models import Q
 from rest_framework import permissions
 
-from ohq.models import Course, Membership, Question
+from ohq.models import Course, Membership
 
 
 # Hierarchy of permissions is usually:
@@ -11,6 +10,26 @@ from ohq.models import Course, Membership, Question
 # scoped to a specific course.
 
 
+def get_membership(request, course_pk):
+    """
+    Get the membership of the requesting user in a course, or None if they aren't a member.
+    Memberships are cached on websocket connections, which drop them when they change,
+    and otherwise for the duration of a request.
+    """
+
+    django_request = getattr(request, "_request", request)
+    memberships = getattr(django_request, "scope", {}).get("memberships")
+    if memberships is None:
+        if not hasattr(django_request, "memberships"):
+            django_request.memberships = {}
+        memberships = django_request.memberships
+
+    key = str(course_pk)
+    if key not in memberships:
+        memberships[key] = Membership.objects.filter(course=course_pk, user=request.user).first()
+    return memberships[key]
+
+
 class IsSuperuser(permissions.BasePermission):
     """
     Grants permission if the current user is a superuser.
@@ -26,6 +45,7 @@ class IsSuperuser(permissions.BasePermission):
 class CoursePermission(permissions.BasePermission):
     """
     Anyone can get or list courses.
+    Members can get the queue page of a course.
     Only head TAs or professors should be able to modify a course.
     Current Head TAs+ or faculty members can create courses.
     No one can delete courses.
@@ -46,6 +66,10 @@ class CoursePermission(permissions.BasePermission):
         if view.action == "destroy":
             return False
 
+        # Members can get the queue page of a course
+        if view.action == "queue_page":
+            return True
+
         # Course leadership can make changes
         if view.action in ["update", "partial_update"]:
             return membership.is_leadership and not obj.archived
@@ -81,7 +105,7 @@ class QueuePermission(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        membership = Membership.objects.get(course=view.kwargs["course_pk"], user=request.user)
+        membership = get_membership(request, view.kwargs["course_pk"])
 
         # Students+ can get a single queue
         if view.action == "retrieve":
@@ -100,9 +124,7 @@ class QueuePermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
 
-        membership = Membership.objects.filter(
-            course=view.kwargs["course_pk"], user=request.user
-        ).first()
+        membership = get_membership(request, view.kwargs["course_pk"])
 
         # Non-Students can't do anything
         if membership is None:
@@ -123,12 +145,13 @@ class QuestionPermission(permissions.BasePermission):
     """
     Students can create questions
     Students can get, list, or modify their own questions.
-    TAs+ can list questions and modify any question.
+    TAs+ can list questions, group similar questions, claim the next question,
+    and modify any question, or many at once.
     No one can delete questions.
     """
 
     def has_object_permission(self, request, view, obj):
-        membership = Membership.objects.get(course=view.kwargs["course_pk"], user=request.user)
+        membership = get_membership(request, view.kwargs["course_pk"])
 
         # Students can get or modify their own question
         # TAs+ can get or modify any questions
@@ -140,9 +163,7 @@ class QuestionPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
 
-        membership = Membership.objects.filter(
-            course=view.kwargs["course_pk"], user=request.user
-        ).first()
+        membership = get_membership(request, view.kwargs["course_pk"])
 
         # Non-Students can't do anything
         if membership is None:
@@ -156,21 +177,38 @@ class QuestionPermission(permissions.BasePermission):
         if view.action in ["last", "quota_count"]:
             return membership.kind == Membership.KIND_STUDENT
 
-        # Students can only create 1 question per queue
-        if view.action == "create":
-            existing_question = Question.objects.filter(
-                Q(queue=view.kwargs["queue_pk"])
-                & Q(asked_by=request.user)
-                & (Q(status=Question.STATUS_ASKED) | Q(status=Question.STATUS_ACTIVE))
-            ).first()
+        # TAs+ can modify many questions at once, claim the next question,
+        # and group similar questions
+        if view.action in ["transition", "next", "similar"]:
+            return membership.is_ta
 
-            return membership.kind == Membership.KIND_STUDENT and existing_question is None
+        # Students can create questions
+        # Only having 1 open question per queue is enforced by the unique_open_question constraint
+        if view.action == "create":
+            return membership.kind == Membership.KIND_STUDENT
 
         # Students+ can get, list, or modify questions
         # With restrictions defined in has_object_permission
         return True
 
 
+class QuestionEventPermission(permissions.BasePermission):
+    """
+    Students can get or list the events of their own questions.
+    TAs+ can get or list the events of any question.
+    """
+
+    def has_permission(self, request, view):
+        # Anonymous users can't do anything
+        if not request.user.is_authenticated:
+            return False
+
+        # Students+ can get or list events
+        return Membership.objects.filter(
+            course=view.kwargs["course_pk"], user=request.user
+        ).exists()
+
+
 class QuestionSearchPermission(permissions.BasePermission):
     """
     TAs+ can list questions.
@@ -340,9 +378,7 @@ class AnnouncementPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
 
-        membership = Membership.objects.filter(
-            course=view.kwargs["course_pk"], user=request.user
-        ).first()
+        membership = get_membership(request, view.kwargs["course_pk"])
 
         # Non-Students can't do anything
         if membership is None:
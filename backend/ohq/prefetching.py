@@ -0,0 +1,36 @@
+import functools
+
+from django.core.exceptions import FieldError
+from django_auto_prefetching import _prefetch
+
+
+@functools.lru_cache(maxsize=None)
+def get_prefetch_plan(serializer_class):
+    """
+    Get the select_related and prefetch_related lookups that django_auto_prefetching derives
+    from a serializer class. Deriving them instantiates the whole tree of nested serializers,
+    and the result only depends on the class, so it is computed once per process.
+    """
+
+    select_related, prefetch_related = _prefetch(serializer_class)
+    return tuple(sorted(select_related)), tuple(sorted(prefetch_related))
+
+
+def prefetch(queryset, serializer_class):
+    """
+    Drop-in replacement for django_auto_prefetching.prefetch that uses the cached prefetch plan
+    of the serializer class.
+    """
+
+    select_related, prefetch_related = get_prefetch_plan(serializer_class)
+    try:
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+    except FieldError as e:
+        raise ValueError(
+            "Calculated wrong field in select_related. Do you have a nested serializer for a "
+            f"ForeignKey where you've forgotten to specify many=True? Original error: {e}"
+        )
@@ -0,0 +1,142 @@
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from ohq.cache import bump_stamps
+from ohq.models import Question, QuestionEvent, Queue
+from ohq.realtime import broadcast_bulk_update
+from ohq.tasks import sendUpNextNotificationTask
+
+
+def annotate_positions(questions):
+    """
+    Annotate the position of each question among the asked questions of its queue by counting
+    the asked questions ahead of it. This works on any subset of questions, e.g. a student's
+    own questions or the questions in a realtime event.
+    """
+
+    ahead = (
+        Question.objects.filter(
+            queue=OuterRef("queue"),
+            status=Question.STATUS_ASKED,
+            time_asked__lt=OuterRef("time_asked"),
+        )
+        .order_by()
+        .values("queue")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    return questions.annotate(position=Coalesce(Subquery(ahead[:1]), 0) + 1)
+
+
+def annotate_positions_window(questions):
+    """
+    Annotate the position of each question with ROW_NUMBER() over the questions of its queue
+    with the same status, ordered by time_asked. Window functions are evaluated after filtering,
+    so the queryset must contain every asked question of its queues and must not be filtered
+    any further.
+    """
+
+    return questions.annotate(
+        position=Window(
+            expression=RowNumber(),
+            partition_by=[F("queue"), F("status")],
+            order_by=F("time_asked").asc(),
+        )
+    )
+
+
+def get_question_version():
+    """
+    Get the newest question version that a sync of a question list can report as up to date.
+    Question writes are stamped with the id of their transaction, see new_question_version(),
+    and every transaction with an id up to this version has either committed or rolled back,
+    so its writes are visible to the queries made afterwards. Writes that were still in
+    progress have newer versions and are returned again by the next sync instead of being
+    missed.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot()) - 1")
+        return cursor.fetchone()[0]
+
+
+def new_question_version(queue_id):
+    """
+    Get the version to stamp a write to a question in a queue with, which is the id of the
+    current transaction. Transaction ids are allocated without taking any locks, so writes to
+    the same queue don't wait for each other. The question stamps of the queue are changed and
+    its question counts are broadcast once the transaction commits.
+    """
+
+    version, course_id = (
+        Queue.objects.filter(id=queue_id)
+        .annotate(version=RawSQL("txid_current()", []))
+        .values_list("version", "course_id")
+        .get()
+    )
+    bump_stamps(f"queue:{queue_id}:questions", f"course:{course_id}:queues")
+    # The question counts of the queue changed without the queue being saved
+    transaction.on_commit(
+        lambda: broadcast_bulk_update(Queue, [queue_id], view_kwargs={"course_pk": course_id})
+    )
+    return version
+
+
+def bulk_transition(questions, status, notify=True, actor=None, **fields):
+    """
+    Move every question in a queryset to a new status with a single UPDATE per queue, setting
+    any other given fields as well. Since update() doesn't send post_save signals, one realtime
+    event is sent per affected queue listing the changed questions. If the questions were
+    closed and notify is set, a single up next notification is enqueued per queue. The
+    transitions are recorded as question events by actor with a single bulk insert.
+    Returns the ids of the updated questions.
+    """
+
+    now = timezone.now()
+    queues = {}
+    with transaction.atomic():
+        rows = list(
+            questions.select_for_update(of=("self",))
+            .order_by()
+            .values_list("id", "queue_id", "status")
+        )
+        for question_id, queue_id, _ in rows:
+            queues.setdefault(queue_id, []).append(question_id)
+
+        if rows:
+            QuestionEvent.objects.bulk_create(
+                [
+                    QuestionEvent(
+                        question_id=question_id,
+                        queue_id=queue_id,
+                        from_status=from_status,
+                        to_status=status,
+                        actor=actor,
+                        time=now,
+                    )
+                    for question_id, queue_id, from_status in rows
+                    if from_status != status
+                ]
+            )
+
+        for queue_id, ids in queues.items():
+            Question.objects.filter(id__in=ids).update(
+                status=status,
+                version=F("version") + 1,
+                modified_version=new_question_version(queue_id),
+                **fields,
+            )
+
+    for queue_id, ids in queues.items():
+        broadcast_bulk_update(Question, ids, view_kwargs={"queue_pk": queue_id})
+        if notify and status in [
+            Question.STATUS_WITHDRAWN,
+            Question.STATUS_REJECTED,
+            Question.STATUS_ANSWERED,
+        ]:
+            sendUpNextNotificationTask.delay(queue_id)
+
+    return [question_id for question_id, _, _ in rows]
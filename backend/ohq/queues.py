@@ -1,9 +1,105 @@
+import math
 from datetime import timedelta
 
-from django.db.models import Avg, F
+from django.db.models import Avg, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery
 from django.utils import timezone
 
-from ohq.models import Question, Queue
+from ohq.cache import bump_stamps
+from ohq.models import Membership, Question, Queue
+
+
+def annotate_queues(queues):
+    """
+    Annotate the number of questions asked, number of questioned currently being answered,
+    and the number of active staff members.
+    Filter/annotation pattern taken from here:
+    https://stackoverflow.com/questions/42543978/django-1-11-annotating-a-subquery-aggregate
+    """
+
+    questions = (
+        Question.objects.filter(queue=OuterRef("pk"))
+        .order_by()
+        .values("queue")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    questions_active = questions.filter(status=Question.STATUS_ACTIVE)
+    questions_asked = questions.filter(status=Question.STATUS_ASKED)
+
+    time_threshold = timezone.now() - timedelta(minutes=1)
+    staff_active = (
+        Membership.objects.filter(
+            Q(course=OuterRef("course__pk"))
+            & ~Q(kind=Membership.KIND_STUDENT)
+            & Q(last_active__gt=time_threshold)
+        )
+        .order_by()
+        .values("course")
+        .annotate(count=Count("*", output_field=FloatField()),)
+        .values("count")
+    )
+    return queues.annotate(
+        questions_active=Subquery(questions_active[:1], output_field=IntegerField()),
+        questions_asked=Subquery(questions_asked[:1]),
+        staff_active=Subquery(staff_active[:1]),
+    )
+
+
+def calculate_quota(queue, times_responded_to, questions_asked):
+    """
+    Get the number of questions a user asked within the rate limit period of a queue and the
+    number of minutes until they can ask another question. times_responded_to are the times
+    the user's questions that count towards the quota were responded to, most recent first.
+    """
+
+    now = timezone.now()
+    start = now - timedelta(minutes=queue.rate_limit_minutes)
+    times_responded_to = [time for time in times_responded_to if time >= start]
+    count = len(times_responded_to)
+
+    wait_time_mins = 0
+    if questions_asked >= queue.rate_limit_length and count >= queue.rate_limit_questions:
+        last_time_responded_to = times_responded_to[queue.rate_limit_questions - 1]
+        wait_time_secs = (
+            queue.rate_limit_minutes * 60 - (now - last_time_responded_to).total_seconds()
+        )
+        wait_time_mins = math.ceil(wait_time_secs / 60)
+
+    return {"count": count, "wait_time_mins": wait_time_mins}
+
+
+def get_quotas(queues, user_ids):
+    """
+    Get the quotas of users in the rate limited queues among queues annotated with
+    annotate_queues(), as a dict mapping (queue id, user id) pairs to calculate_quota() results.
+    Uses a single query.
+    """
+
+    rate_limited = [queue for queue in queues if queue.rate_limit_enabled]
+    if not rate_limited:
+        return {}
+
+    minutes = max(queue.rate_limit_minutes for queue in rate_limited)
+    times_responded_to = {}
+    for queue_id, user_id, time_responded_to in (
+        Question.objects.filter(
+            queue__in=rate_limited,
+            asked_by__in=user_ids,
+            time_responded_to__gte=timezone.now() - timedelta(minutes=minutes),
+        )
+        .exclude(status__in=[Question.STATUS_REJECTED, Question.STATUS_WITHDRAWN])
+        .order_by("-time_responded_to")
+        .values_list("queue", "asked_by", "time_responded_to")
+    ):
+        times_responded_to.setdefault((queue_id, user_id), []).append(time_responded_to)
+
+    return {
+        (queue.id, user_id): calculate_quota(
+            queue, times_responded_to.get((queue.id, user_id), []), queue.questions_asked or 0
+        )
+        for queue in rate_limited
+        for user_id in user_ids
+    }
 
 
 def calculate_wait_times():
@@ -14,7 +110,10 @@ def calculate_wait_times():
     """
 
     # TODO: don't set wait time to -1 if a queue still has questions in it
-    Queue.objects.filter(archived=False, active=False).update(estimated_wait_time=-1)
+    closed = Queue.objects.filter(archived=False, active=False)
+    closed.update(estimated_wait_time=-1)
+    courses = set(closed.values_list("course", flat=True))
+    bump_stamps(*[f"course:{course_id}:queues" for course_id in courses])
 
     time = timezone.now() - timedelta(minutes=10)
     queues = Queue.objects.filter(archived=False, active=True)
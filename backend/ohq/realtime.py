@@ -0,0 +1,550 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.decorators import classonlymethod
+from rest_live import CREATED, DELETED, UPDATED, get_group_name
+from rest_live.consumers import Subscription, SubscriptionConsumer
+from rest_live.mixins import RealtimeMixin as BaseRealtimeMixin
+from rest_live.routers import RealtimeRouter as BaseRealtimeRouter
+from rest_live.signals import save_handler
+
+from ohq.models import Announcement, Membership
+
+
+# Realtime views of models whose broadcasts are fanned out to groups of subscribers
+group_broadcast_views = {}
+
+# Realtime views by the label of their model
+realtime_views = {}
+
+
+def get_broadcast_group_name(model_label, *parts):
+    return "-".join([get_group_name(model_label), *(str(part) for part in parts)])
+
+
+def get_membership_group_name(user_id):
+    return f"ohq-user-{user_id}-memberships"
+
+
+class RealtimeMixin(BaseRealtimeMixin):
+    """
+    RealtimeMixin whose views built from a scope keep their action. DRF sets the action from
+    the action map when the request is initialized, and views built from a scope don't have
+    one, so permissions that depend on the action would otherwise see None.
+    """
+
+    @classonlymethod
+    def from_scope(cls, viewset_action, scope, view_kwargs, query_params):
+        view = super().from_scope(viewset_action, scope, view_kwargs, query_params)
+        view.action = viewset_action
+        return view
+
+    @classmethod
+    def get_broadcast_kwargs(cls, instance):
+        """
+        Get the view kwargs that subscriptions to an instance's broadcasts must match. Without any,
+        every subscription to the model evaluates the broadcast.
+        """
+
+        return {}
+
+
+class GroupBroadcastMixin:
+    """
+    Mixin for realtime views whose subscribers can be split into groups that all see the same
+    instances, e.g. the staff of a queue. Changed instances are serialized once per event
+    and sent to the channel layer group of each subscriber group that can see them, instead
+    of every subscription evaluating its own queryset.
+    """
+
+    def get_broadcast_group_names(self):
+        """
+        Get the names of the broadcast groups a subscription to this view should join.
+        Called once when the subscription is made.
+        """
+
+        raise NotImplementedError
+
+    @classmethod
+    def get_broadcast_kwargs(cls, instance):
+        """
+        Get the view kwargs that subscriptions to an instance's broadcasts must match.
+        """
+
+        raise NotImplementedError
+
+    @classmethod
+    def get_broadcasts(cls, instance_pks, view_kwargs):
+        """
+        Serialize changed instances for the subscriber groups that can see them.
+        Returns a dict mapping group names to the serialized instances visible to that group.
+        Every group that could previously see one of the instances must be included so that
+        instances that are no longer visible are removed.
+        """
+
+        raise NotImplementedError
+
+    @classmethod
+    def get_related_broadcasts(cls, instance_pks, view_kwargs):
+        """
+        Serialize instances of other group broadcast models whose data depends on the changed
+        instances, e.g. the student queues that show a question. Returns a list of
+        (model label, instance pks, view kwargs, broadcasts) tuples, where broadcasts are in the
+        format returned by get_broadcasts().
+        """
+
+        return []
+
+
+def broadcast_bulk_update(model, instance_pks, view_kwargs=None):
+    """
+    Notify realtime subscribers that many instances of a model were changed at once, e.g.
+    through a queryset update() which doesn't send post_save signals.
+    A single event is sent for all of the instances. If view_kwargs are provided, only
+    subscriptions with matching view kwargs (e.g. the same queue) evaluate the event.
+    """
+
+    model_label = model._meta.label
+    view = group_broadcast_views.get(model_label)
+    if view is not None:
+        broadcast_groups(view, model_label, instance_pks, view_kwargs or {})
+        return
+
+    group_name = get_group_name(model_label)
+    async_to_sync(get_channel_layer().group_send)(
+        group_name,
+        {
+            "type": "models.saved",
+            "model": model_label,
+            "instance_pks": list(instance_pks),
+            "view_kwargs": view_kwargs or {},
+            "channel_name": group_name,
+        },
+    )
+
+
+def broadcast_groups(view, model_label, instance_pks, view_kwargs):
+    """
+    Send the instances serialized by a group broadcast view to each subscriber group, along with
+    its related broadcasts.
+    """
+
+    instance_pks = list(instance_pks)
+    send = async_to_sync(get_channel_layer().group_send)
+    related = view.get_related_broadcasts(instance_pks, view_kwargs)
+    for model_label, instance_pks, view_kwargs, broadcasts in [
+        (model_label, instance_pks, view_kwargs, view.get_broadcasts(instance_pks, view_kwargs)),
+        *related,
+    ]:
+        for group_name, instances in broadcasts.items():
+            send(
+                group_name,
+                {
+                    "type": "instances.broadcast",
+                    "model": model_label,
+                    "instance_pks": instance_pks,
+                    "instances": instances,
+                    "view_kwargs": view_kwargs,
+                },
+            )
+
+
+def broadcast_save_handler(sender, instance, **kwargs):
+    """
+    Broadcast a saved instance of a realtime model once the transaction commits, through the same
+    events as bulk updates.
+    """
+
+    view = realtime_views[sender._meta.label]
+    pk, view_kwargs = instance.pk, view.get_broadcast_kwargs(instance)
+    transaction.on_commit(lambda: broadcast_bulk_update(sender, [pk], view_kwargs=view_kwargs))
+
+
+def subscription_key(subscription):
+    """
+    Identify what a subscription subscribed to. Subscriptions with the same key on one
+    connection see the same instances.
+    """
+
+    return (
+        subscription.action,
+        tuple(sorted((key, str(value)) for key, value in subscription.view_kwargs.items())),
+        tuple(sorted((key, str(value)) for key, value in subscription.query_params.items())),
+    )
+
+
+class BulkSubscriptionConsumer(SubscriptionConsumer):
+    """
+    Subscription consumer that can also handle coalesced events for many instances.
+    Each subscription evaluates its queryset once for the whole batch and clients
+    receive the same per-instance broadcasts as for individual saves.
+    Subscriptions to group broadcast views join their broadcast groups instead and receive
+    instances that were already serialized.
+
+    Subscriptions made with "patch" set only receive the fields of an instance that changed
+    since it was last sent to them, and can send a "resync" message to receive the full
+    contents of their queryset again.
+    """
+
+    def connect(self):
+        # Broadcast group names for each group broadcast subscription, by request id
+        self.broadcast_groups = {}
+        self.joined_broadcast_groups = set()
+        # Last data sent for each instance to patch mode subscriptions, by request id
+        self.sent_instances = {}
+        # Memberships of the user by course, cached for the lifetime of the connection
+        self.scope["memberships"] = {}
+        super().connect()
+
+        user = self.scope.get("user")
+        if user is not None and user.is_authenticated:
+            group_name = get_membership_group_name(user.id)
+            async_to_sync(self.channel_layer.group_add)(group_name, self.channel_name)
+            self.groups.append(group_name)
+
+    def membership_changed(self, event):
+        """
+        Drop the cached membership of the user in a course when it changes, and check the
+        subscriptions to the course again. Subscriptions the user no longer has permission
+        for are removed.
+        """
+
+        course_pk = str(event["course_id"])
+        self.scope["memberships"].pop(course_pk, None)
+
+        for model_label, viewset_class in self.registry.items():
+            group_name = get_group_name(model_label)
+            for subscription in list(self.subscriptions.get(group_name, [])):
+                if str(subscription.view_kwargs.get("course_pk")) != course_pk:
+                    continue
+
+                view = viewset_class.from_scope(
+                    subscription.action,
+                    self.scope,
+                    subscription.view_kwargs,
+                    subscription.query_params,
+                )
+                if all(
+                    permission.has_permission(view.request, view)
+                    for permission in view.get_permissions()
+                ):
+                    if subscription.request_id in self.broadcast_groups:
+                        self.broadcast_groups[
+                            subscription.request_id
+                        ] = view.get_broadcast_group_names()
+                    continue
+
+                self.subscriptions[group_name].remove(subscription)
+                self.groups.remove(group_name)
+                self.broadcast_groups.pop(subscription.request_id, None)
+                self.sent_instances.pop(subscription.request_id, None)
+                self.send_error(
+                    subscription.request_id,
+                    403,
+                    f"Unauthorized to subscribe to {model_label} for action {subscription.action}",
+                )
+        self.update_broadcast_groups()
+
+    def receive_json(self, content, **kwargs):
+        if content.get("type") == "resync":
+            self.resync(content.get("id"))
+            return
+
+        model_label = content.get("model")
+        group_name = get_group_name(model_label) if model_label else None
+        before = {id(s) for s in self.subscriptions.get(group_name, [])}
+        message_type = content.get("type")
+        existing = self.find_identical_subscription(content)
+        if existing is not None:
+            # An identical subscription already passed the permission checks and has the
+            # visible instances, so the new request id can share it without any queries
+            self.subscriptions[group_name].append(
+                Subscription(
+                    content["id"],
+                    action=existing.action,
+                    view_kwargs=existing.view_kwargs,
+                    query_params=existing.query_params,
+                    pks_in_queryset=set(existing.pks_in_queryset),
+                )
+            )
+            self.groups.append(group_name)
+        else:
+            super().receive_json(content, **kwargs)
+
+        if message_type == "subscribe":
+            for subscription in self.subscriptions.get(group_name, []):
+                if id(subscription) in before:
+                    continue
+                if content.get("patch"):
+                    self.sent_instances[subscription.request_id] = {}
+                if existing is not None and existing.request_id in self.broadcast_groups:
+                    self.broadcast_groups[subscription.request_id] = self.broadcast_groups[
+                        existing.request_id
+                    ]
+                elif model_label in group_broadcast_views:
+                    view = self.registry[model_label].from_scope(
+                        subscription.action,
+                        self.scope,
+                        subscription.view_kwargs,
+                        subscription.query_params,
+                    )
+                    self.broadcast_groups[
+                        subscription.request_id
+                    ] = view.get_broadcast_group_names()
+        elif message_type == "unsubscribe":
+            self.broadcast_groups.pop(content.get("id"), None)
+            self.sent_instances.pop(content.get("id"), None)
+        self.update_broadcast_groups()
+
+    def find_identical_subscription(self, content):
+        """
+        Find a list subscription on this connection identical to the one requested in a
+        subscribe message, if there is one.
+        """
+
+        if content.get("type") != "subscribe" or content.get("action") != "list":
+            return None
+        if content.get("model") not in self.registry:
+            return None
+        key = subscription_key(
+            Subscription(
+                content.get("id"),
+                action="list",
+                view_kwargs=content.get("view_kwargs", {}),
+                query_params=content.get("query_params", {}),
+                pks_in_queryset=set(),
+            )
+        )
+        for subscription in self.subscriptions.get(get_group_name(content["model"]), []):
+            if subscription_key(subscription) == key:
+                return subscription
+        return None
+
+    def get_subscription(self, request_id):
+        for model_label in self.registry:
+            for subscription in self.subscriptions.get(get_group_name(model_label), []):
+                if subscription.request_id == request_id:
+                    return model_label, subscription
+        return None, None
+
+    def send_broadcast(self, request_id, model_label, action, instance_data, renderer):
+        """
+        Send changed fields only to patch mode subscriptions that were already sent an
+        instance. Patches include the version they apply to, if the model is versioned.
+        """
+
+        sent = self.sent_instances.get(request_id)
+        if sent is None:
+            return super().send_broadcast(request_id, model_label, action, instance_data, renderer)
+
+        pk = instance_data["id"]
+        if action == DELETED:
+            sent.pop(pk, None)
+            return super().send_broadcast(request_id, model_label, action, instance_data, renderer)
+
+        previous = sent.get(pk)
+        sent[pk] = instance_data
+        if previous is None or action == CREATED:
+            return super().send_broadcast(request_id, model_label, action, instance_data, renderer)
+
+        patch = {key: value for key, value in instance_data.items() if previous.get(key) != value}
+        if not patch:
+            return
+        message = {
+            "type": "broadcast",
+            "id": request_id,
+            "model": model_label,
+            "action": UPDATED,
+            "patch": True,
+            "instance": {"id": pk, **patch},
+        }
+        if "version" in previous:
+            message["base_version"] = previous["version"]
+        self.send(text_data=renderer.render(message).decode("utf-8"))
+
+    def resync(self, request_id):
+        """
+        Send the full contents of a subscription's queryset, e.g. after a client missed a patch.
+        Clients should replace the instances they have for the subscription.
+        """
+
+        model_label, subscription = self.get_subscription(request_id)
+        if subscription is None:
+            self.send_error(request_id, 404, "Attempted to resync before subscribing.")
+            return
+
+        view = self.registry[model_label].from_scope(
+            subscription.action, self.scope, subscription.view_kwargs, subscription.query_params
+        )
+        renderer = view.perform_content_negotiation(view.request)[0]
+        instance_data = view.get_serializer_class()(
+            view.get_queryset(),
+            many=True,
+            context={"request": view.request, "format": "json", "view": view},
+        ).data
+        subscription.pks_in_queryset = {data["id"] for data in instance_data}
+        if request_id in self.sent_instances:
+            self.sent_instances[request_id] = {data["id"]: data for data in instance_data}
+        self.send(
+            text_data=renderer.render(
+                {
+                    "type": "resync",
+                    "id": request_id,
+                    "model": model_label,
+                    "instances": instance_data,
+                }
+            ).decode("utf-8")
+        )
+
+    def update_broadcast_groups(self):
+        """
+        Join the broadcast groups needed by the current subscriptions and leave the others.
+        """
+
+        needed = {name for names in self.broadcast_groups.values() for name in names}
+        for name in needed - self.joined_broadcast_groups:
+            async_to_sync(self.channel_layer.group_add)(name, self.channel_name)
+            self.groups.append(name)
+        for name in self.joined_broadcast_groups - needed:
+            async_to_sync(self.channel_layer.group_discard)(name, self.channel_name)
+            self.groups.remove(name)
+        self.joined_broadcast_groups = needed
+
+    def group_subscriptions(self, model_label, view_kwargs):
+        """
+        Get the subscriptions to a model that match an event's view kwargs, grouped by what they
+        subscribed to. Clients can make identical subscriptions on one connection, e.g. from
+        different components of a page, and each group only needs to be evaluated once.
+        """
+
+        groups = {}
+        for subscription in self.subscriptions.get(get_group_name(model_label), []):
+            if any(
+                str(subscription.view_kwargs.get(key)) != str(value)
+                for key, value in view_kwargs.items()
+            ):
+                continue
+            groups.setdefault(subscription_key(subscription), []).append(subscription)
+        return groups.values()
+
+    def send_instances(self, subscriptions, model_label, instances, instance_pks, view, renderer):
+        """
+        Send a list of (pk, data) tuples of the changed instances that are visible to a group of
+        identical subscriptions. Instances that were visible before but no longer are have
+        been deleted from the point of view of a subscription.
+        """
+
+        visible_pks = {pk for pk, _ in instances}
+        for subscription in subscriptions:
+            for pk, data in instances:
+                action = UPDATED if pk in subscription.pks_in_queryset else CREATED
+                subscription.pks_in_queryset.add(pk)
+                self.send_broadcast(subscription.request_id, model_label, action, data, renderer)
+
+            for pk in instance_pks:
+                if pk in subscription.pks_in_queryset and pk not in visible_pks:
+                    subscription.pks_in_queryset.remove(pk)
+                    self.send_broadcast(
+                        subscription.request_id,
+                        model_label,
+                        DELETED,
+                        {view.lookup_field: pk, "id": pk},
+                        renderer,
+                    )
+
+    def instances_broadcast(self, event):
+        """
+        Send instances serialized for one of this connection's broadcast groups to the matching
+        subscriptions.
+        """
+
+        model_label = event["model"]
+        viewset_class = self.registry[model_label]
+        instances = [(data["id"], data) for data in event["instances"]]
+        for subscriptions in self.group_subscriptions(model_label, event["view_kwargs"]):
+            subscription = subscriptions[0]
+            view = viewset_class.from_scope(
+                subscription.action,
+                self.scope,
+                subscription.view_kwargs,
+                subscription.query_params,
+            )
+            renderer = view.perform_content_negotiation(view.request)[0]
+            self.send_instances(
+                subscriptions, model_label, instances, event["instance_pks"], view, renderer
+            )
+
+    def models_saved(self, event):
+        model_label = event["model"]
+        viewset_class = self.registry[model_label]
+        for subscriptions in self.group_subscriptions(model_label, event["view_kwargs"]):
+            subscription = subscriptions[0]
+            view = viewset_class.from_scope(
+                subscription.action,
+                self.scope,
+                subscription.view_kwargs,
+                subscription.query_params,
+            )
+            renderer = view.perform_content_negotiation(view.request)[0]
+            queryset = view.get_queryset().filter(pk__in=event["instance_pks"])
+            instance_data = view.get_serializer_class()(
+                queryset,
+                many=True,
+                context={"request": view.request, "format": "json", "view": view},
+            ).data
+            instances = [(instance.pk, data) for instance, data in zip(queryset, instance_data)]
+            self.send_instances(
+                subscriptions, model_label, instances, event["instance_pks"], view, renderer
+            )
+
+
+class RealtimeRouter(BaseRealtimeRouter):
+    """
+    Realtime router whose consumer understands coalesced bulk update events.
+    rest_live's save handler is replaced so that saves are broadcast once the transaction commits
+    as bulk update events, which are fanned out to subscriber groups for group broadcast views.
+    """
+
+    def register(self, view):
+        super().register(view)
+        model = view.queryset.model
+        realtime_views[model._meta.label] = view
+        if issubclass(view, GroupBroadcastMixin):
+            group_broadcast_views[model._meta.label] = view
+        post_save.disconnect(save_handler, sender=model, dispatch_uid="rest-live")
+        post_save.connect(broadcast_save_handler, sender=model, dispatch_uid="ohq-broadcast")
+
+    def as_consumer(self):
+        return type(
+            "BoundSubscriptionConsumer",
+            (BulkSubscriptionConsumer,),
+            dict(registry=self.registry, public=self.public),
+        )
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def broadcast_membership_changed(sender, instance, **kwargs):
+    """
+    Tell the websocket connections of a user that their membership in a course changed, so
+    they drop their cached membership.
+    """
+
+    group_name = get_membership_group_name(instance.user_id)
+    event = {"type": "membership.changed", "course_id": instance.course_id}
+    transaction.on_commit(lambda: async_to_sync(get_channel_layer().group_send)(group_name, event))
+
+
+@receiver(post_delete, sender=Announcement)
+def broadcast_announcement_deleted(sender, instance, **kwargs):
+    """
+    rest_live only broadcasts saves, so send an event for deleted announcements as well.
+    Subscribers that could see the announcement receive a DELETED broadcast.
+    """
+
+    pk, course_id = instance.pk, instance.course_id
+    transaction.on_commit(
+        lambda: broadcast_bulk_update(Announcement, [pk], view_kwargs={"course_pk": course_id})
+    )
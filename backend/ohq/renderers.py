@@ -0,0 +1,97 @@
+import re
+
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case import render
+from djangorestframework_camel_case.settings import api_settings as camel_case_settings
+from djangorestframework_camel_case.util import camelize, camelize_re, underscore_to_camel
+from rest_framework.settings import api_settings
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# Response keys are mostly the field names of a small number of serializers, so each key is
+# only converted to camelCase the first time it is rendered
+camel_keys = {}
+MAX_CAMEL_KEYS = 10000
+
+
+def camel_key(key):
+    camel = camel_keys.get(key)
+    if camel is None:
+        if isinstance(key, Promise):
+            key = force_str(key)
+        camel = re.sub(camelize_re, underscore_to_camel, key) if "_" in key else key
+        if len(camel_keys) < MAX_CAMEL_KEYS:
+            camel_keys[key] = camel
+    return camel
+
+
+class CamelizeFallback(Exception):
+    """
+    Raised when data can't be rendered the fast way with the same output as the stdlib encoder.
+    """
+
+
+def camelize_fast(data, default):
+    """
+    Camelize the keys of serialized data like camelize, and convert the values the JSON encoder
+    doesn't support with its default method, so that the result can be encoded by orjson.
+    Raises CamelizeFallback for floats that orjson formats differently than the json module.
+    """
+
+    if isinstance(data, dict):
+        return {
+            (camel_key(key) if isinstance(key, (str, Promise)) else key): camelize_fast(
+                value, default
+            )
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [camelize_fast(item, default) for item in data]
+    if data is None or isinstance(data, (str, bool, int)):
+        return data
+    if isinstance(data, float):
+        # The json module writes exponents like 1e-05 where orjson writes 0.00001
+        if data != 0 and not 1e-4 <= abs(data) < 1e16:
+            raise CamelizeFallback
+        return data
+
+    camelized = camelize(data)
+    if camelized is not data:
+        # Iterables and lazy strings
+        return camelize_fast(camelized, default)
+    return camelize_fast(default(data), default)
+
+
+class CamelCaseJSONRenderer(render.CamelCaseJSONRenderer):
+    """
+    CamelCaseJSONRenderer that converts each key to camelCase once and encodes with orjson when
+    it is installed. The output is byte for byte the same as the original renderer's, and data
+    that orjson would encode differently falls back to it.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+            or not api_settings.UNICODE_JSON
+            or not api_settings.COMPACT_JSON
+            or camel_case_settings.JSON_UNDERSCOREIZE.get("ignore_fields")
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(
+                camelize_fast(data, self.encoder_class().default), option=orjson.OPT_NON_STR_KEYS,
+            )
+        except (CamelizeFallback, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like JSONRenderer, escape the characters that are valid JSON but not valid JavaScript
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
@@ -1,10 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.utils import timezone
 from django.utils.crypto import get_random_string
 from phonenumber_field.serializerfields import PhoneNumberField
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
 
+from ohq.cache import get_course_tags
 from ohq.models import (
     Announcement,
     Course,
@@ -12,15 +14,26 @@ from ohq.models import (
     MembershipInvite,
     Profile,
     Question,
+    QuestionEvent,
     Queue,
     QueueStatistic,
     Semester,
     Tag,
 )
+from ohq.questions import annotate_positions, new_question_version
+from ohq.queues import annotate_queues, get_quotas
+from ohq.realtime import broadcast_bulk_update
+from ohq.similarity import index_question
 from ohq.sms import sendSMSVerification
 from ohq.tasks import sendUpNextNotificationTask
 
 
+class QuestionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "question was modified by someone else"
+    default_code = "conflict"
+
+
 class CourseRouteMixin(serializers.ModelSerializer):
     """
     Mixin for serializers that overrides the save method to
@@ -40,9 +53,10 @@ class QueueRouteMixin(serializers.ModelSerializer):
     properly handle the URL parameter for queues.
     """
 
-    def save(self):
-        self.validated_data["queue"] = Queue.objects.get(pk=self.context["view"].kwargs["queue_pk"])
-        return super().save()
+    def save(self, **kwargs):
+        if "queue" not in kwargs:
+            kwargs["queue"] = Queue.objects.get(pk=self.context["view"].kwargs["queue_pk"])
+        return super().save(**kwargs)
 
 
 class SemesterSerializer(serializers.ModelSerializer):
@@ -186,6 +200,7 @@ class QuestionSerializer(QueueRouteMixin):
     asked_by = UserSerializer(read_only=True)
     responded_to_by = UserSerializer(read_only=True)
     tags = TagSerializer(many=True)
+    position = serializers.SerializerMethodField()
 
     class Meta:
         model = Question
@@ -204,6 +219,8 @@ class QuestionSerializer(QueueRouteMixin):
             "tags",
             "note",
             "resolved_note",
+            "version",
+            "position",
         )
         read_only_fields = (
             "time_asked",
@@ -215,14 +232,37 @@ class QuestionSerializer(QueueRouteMixin):
             "resolved_note",
         )
 
+    def get_position(self, obj):
+        """
+        The position of an asked question in its queue, or -1 for other questions.
+        Only available if the queryset was annotated with positions.
+        """
+
+        position = getattr(obj, "position", None)
+        if position is None:
+            return None
+        return position if obj.status == Question.STATUS_ASKED else -1
+
     def update(self, instance, validated_data):
         """
         Students can update their question's text and video_chat_url or withdraw the question
         TAs+ can only modify the status of a question.
+        Only the fields that changed are written, and only if the question is still at the
+        version the client last saw (or the version that was just read). Otherwise, another
+        update happened in the meantime and the request is rejected with a 409.
         """
         user = self.context["request"].user
         membership = Membership.objects.get(course=instance.queue.course, user=user)
         queue_id = self.context["view"].kwargs["queue_pk"]
+        version = validated_data.get("version", instance.version)
+        from_status = instance.status
+        changed = []
+        notify = False
+
+        def set_field(field, value):
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                changed.append(field)
 
         if membership.is_ta:  # User is a TA+
             if "status" in validated_data:
@@ -231,76 +271,324 @@ class QuestionSerializer(QueueRouteMixin):
                     raise serializers.ValidationError(
                         detail={"detail": "TAs can't mark a question as withdrawn"}
                     )
-                instance.status = status
+                set_field("status", status)
                 if status == Question.STATUS_ACTIVE:
-                    instance.responded_to_by = user
-                    instance.time_response_started = timezone.now()
+                    set_field("responded_to_by", user)
+                    set_field("time_response_started", timezone.now())
                 elif status == Question.STATUS_REJECTED:
-                    instance.responded_to_by = user
-                    instance.time_response_started = timezone.now()
-                    instance.time_responded_to = timezone.now()
-                    instance.rejected_reason = validated_data["rejected_reason"]
-                    sendUpNextNotificationTask.delay(queue_id)
+                    set_field("responded_to_by", user)
+                    set_field("time_response_started", timezone.now())
+                    set_field("time_responded_to", timezone.now())
+                    set_field("rejected_reason", validated_data["rejected_reason"])
+                    notify = True
                 elif status == Question.STATUS_ANSWERED:
-                    instance.time_responded_to = timezone.now()
-                    sendUpNextNotificationTask.delay(queue_id)
+                    set_field("time_responded_to", timezone.now())
+                    notify = True
                 elif status == Question.STATUS_ASKED:
-                    instance.responded_to_by = None
-                    instance.time_response_started = None
+                    set_field("responded_to_by", None)
+                    set_field("time_response_started", None)
             if "note" in validated_data:
-                instance.note = validated_data["note"]
-                instance.resolved_note = False
+                set_field("note", validated_data["note"])
+                set_field("resolved_note", False)
         else:  # User is a student
             if "status" in validated_data:
                 status = validated_data["status"]
                 if status == Question.STATUS_WITHDRAWN:
-                    instance.status = status
-                    sendUpNextNotificationTask.delay(queue_id)
+                    set_field("status", status)
+                    notify = True
                 elif status == Question.STATUS_ANSWERED:
-                    instance.status = status
-                    instance.time_responded_to = timezone.now()
+                    set_field("status", status)
+                    set_field("time_responded_to", timezone.now())
                 else:
                     raise serializers.ValidationError(
                         detail={"detail": "Students can only withdraw a question"}
                     )
             if "text" in validated_data:
-                instance.text = validated_data["text"]
+                set_field("text", validated_data["text"])
             if "video_chat_url" in validated_data:
-                instance.video_chat_url = validated_data["video_chat_url"]
-            if "tags" in validated_data:
-                instance.tags.clear()
-                for tag_data in validated_data.pop("tags"):
-                    try:
-                        tag = Tag.objects.get(course=instance.queue.course, **tag_data)
-                        instance.tags.add(tag)
-                    except ObjectDoesNotExist:
-                        continue
+                set_field("video_chat_url", validated_data["video_chat_url"])
             # If a student modifies a question, discard any note added by a TA and mark as resolved
-            instance.note = ""
-            instance.resolved_note = True
-
-        instance.save()
+            set_field("note", "")
+            set_field("resolved_note", True)
+
+        tags = validated_data.get("tags") if not membership.is_ta else None
+        if not changed and tags is None:
+            return instance
+
+        with transaction.atomic():
+            # Lock the question if it's still at the expected version, then stamp it with a new
+            # question version and write only the changed fields
+            questions = Question.objects.filter(pk=instance.pk, version=version)
+            if not questions.select_for_update().exists():
+                raise QuestionConflict()
+            if "status" in changed:
+                QuestionEvent.objects.create(
+                    question=instance,
+                    queue_id=instance.queue_id,
+                    from_status=from_status,
+                    to_status=instance.status,
+                    actor=user,
+                )
+            if tags is not None:
+                self.set_tags(instance, tags)
+            instance.version = version + 1
+            instance.modified_version = new_question_version(instance.queue_id)
+            questions.update(
+                version=instance.version,
+                modified_version=instance.modified_version,
+                **{field: getattr(instance, field) for field in changed},
+            )
+
+        if "text" in changed:
+            index_question(instance)
+        # update() doesn't send post_save signals, so notify realtime subscribers directly
+        broadcast_bulk_update(Question, [instance.pk], view_kwargs={"queue_pk": instance.queue_id})
+        if notify:
+            sendUpNextNotificationTask.delay(queue_id)
         return instance
 
     def create(self, validated_data):
+        """
+        The queue is provided by QuestionViewSet.create, annotated with the number of
+        questions that are currently asked (i.e. ahead of this one).
+        """
+
         tags = validated_data.pop("tags")
-        queue = Queue.objects.get(pk=self.context["view"].kwargs["queue_pk"])
-        questions_ahead = Question.objects.filter(
-            queue=queue, status=Question.STATUS_ASKED, time_asked__lt=timezone.now()
-        ).count()
-        validated_data["should_send_up_soon_notification"] = questions_ahead >= 4
+        queue = validated_data["queue"]
+        validated_data["should_send_up_soon_notification"] = queue.questions_asked >= 4
+        validated_data.pop("version", None)
         validated_data["status"] = Question.STATUS_ASKED
+        validated_data["created_version"] = new_question_version(queue.id)
+        validated_data["modified_version"] = validated_data["created_version"]
         validated_data["asked_by"] = self.context["request"].user
         question = super().create(validated_data)
-        for tag_data in tags:
-            try:
-                tag = Tag.objects.get(course=queue.course, **tag_data)
-                question.tags.add(tag)
-            except ObjectDoesNotExist:
-                continue
+        QuestionEvent.objects.create(
+            question=question,
+            queue=queue,
+            to_status=Question.STATUS_ASKED,
+            actor=question.asked_by,
+        )
+        self.set_tags(question, tags, created=True)
+        index_question(question)
         return question
-        validated_data["note"] = ""
-        return super().create(validated_data)
+
+    def set_tags(self, question, tags, created=False):
+        """
+        Set the tags of a question to the tags of its course whose names are in tags.
+        Tags that don't exist in the course are ignored. Only the difference to the
+        question's current tags is written, with a single bulk delete and bulk insert.
+        """
+
+        names = {tag["name"] for tag in tags}
+        tag_ids = {
+            tag["id"] for tag in get_course_tags(question.queue.course_id) if tag["name"] in names
+        }
+        QuestionTag = Question.tags.through
+        existing_ids = set()
+        if not created:
+            existing_ids = set(
+                QuestionTag.objects.filter(question=question).values_list("tag_id", flat=True)
+            )
+
+        removed_ids = existing_ids - tag_ids
+        if removed_ids:
+            QuestionTag.objects.filter(question=question, tag_id__in=removed_ids).delete()
+        added_ids = tag_ids - existing_ids
+        if added_ids:
+            QuestionTag.objects.bulk_create(
+                [QuestionTag(question=question, tag_id=tag_id) for tag_id in added_ids]
+            )
+
+
+def serialize_questions(questions):
+    """
+    Serialize a queryset of questions for reading with the same output as QuestionSerializer.
+    The questions are read with a single values() query joining their askers and responders,
+    and the tags of all of them are read with one more query. This avoids the per-field
+    dispatch of nested serializers, which dominates the time spent on long lists.
+    """
+
+    user_fields = UserSerializer.Meta.fields
+    has_position = "position" in questions.query.annotations
+    rows = questions.prefetch_related(None).values(
+        "id",
+        "text",
+        "video_chat_url",
+        "status",
+        "time_asked",
+        "time_response_started",
+        "time_responded_to",
+        "responded_to_by_id",
+        "rejected_reason",
+        "should_send_up_soon_notification",
+        "note",
+        "resolved_note",
+        "version",
+        *[f"asked_by__{field}" for field in user_fields],
+        *[f"responded_to_by__{field}" for field in user_fields],
+        *(["position"] if has_position else []),
+    )
+    rows = list(rows)
+
+    tags = {}
+    for question_id, tag_id, name in (
+        Question.tags.through.objects.filter(question_id__in=[row["id"] for row in rows])
+        .order_by("tag_id")
+        .values_list("question_id", "tag_id", "tag__name")
+    ):
+        tags.setdefault(question_id, []).append({"id": tag_id, "name": name})
+
+    to_datetime = serializers.DateTimeField().to_representation
+    data = []
+    for row in rows:
+        position = None
+        if has_position and row["position"] is not None:
+            position = row["position"] if row["status"] == Question.STATUS_ASKED else -1
+        responded_to_by = None
+        if row["responded_to_by_id"] is not None:
+            responded_to_by = {field: row[f"responded_to_by__{field}"] for field in user_fields}
+        data.append(
+            {
+                "id": row["id"],
+                "text": row["text"],
+                "video_chat_url": row["video_chat_url"],
+                "status": row["status"],
+                "time_asked": to_datetime(row["time_asked"]),
+                "asked_by": {field: row[f"asked_by__{field}"] for field in user_fields},
+                "time_response_started": to_datetime(row["time_response_started"]),
+                "time_responded_to": to_datetime(row["time_responded_to"]),
+                "responded_to_by": responded_to_by,
+                "rejected_reason": row["rejected_reason"],
+                "should_send_up_soon_notification": row["should_send_up_soon_notification"],
+                "tags": tags.get(row["id"], []),
+                "note": row["note"],
+                "resolved_note": row["resolved_note"],
+                "version": row["version"],
+                "position": position,
+            }
+        )
+    return data
+
+
+def serialize_student_queues(queues, user_ids):
+    """
+    Serialize queues annotated with annotate_queues() from the point of view of each of the given
+    users, as shown by the student queue page: the user's open question in the queue with its
+    position, the last question they asked in it and their quota if it is rate limited.
+    Returns a dict mapping user ids to lists of {"id", "question", "last_question", "quota"}
+    dictionaries in the order of queues. Uses a fixed number of queries.
+    """
+
+    queues = list(queues)
+    questions = Question.objects.filter(queue__in=queues, asked_by__in=user_ids)
+
+    open_questions = annotate_positions(
+        questions.filter(status__in=[Question.STATUS_ASKED, Question.STATUS_ACTIVE])
+    )
+    last_questions = (
+        questions.filter(
+            status__in=[
+                Question.STATUS_WITHDRAWN,
+                Question.STATUS_REJECTED,
+                Question.STATUS_ANSWERED,
+            ]
+        )
+        .order_by("queue", "asked_by", "-time_asked")
+        .distinct("queue", "asked_by")
+    )
+    data = {
+        "question": serialize_questions(open_questions),
+        "last_question": serialize_questions(last_questions),
+    }
+    keys = {
+        question_id: (queue_id, user_id)
+        for question_id, queue_id, user_id in Question.objects.filter(
+            id__in=[question["id"] for questions in data.values() for question in questions]
+        ).values_list("id", "queue_id", "asked_by_id")
+    }
+    found = {
+        (*keys[question["id"]], field): question
+        for field, questions in data.items()
+        for question in questions
+    }
+
+    quotas = get_quotas(queues, user_ids)
+    return {
+        user_id: [
+            {
+                "id": queue.id,
+                "question": found.get((queue.id, user_id, "question")),
+                "last_question": found.get((queue.id, user_id, "last_question")),
+                "quota": quotas.get((queue.id, user_id)),
+            }
+            for queue in queues
+        ]
+        for user_id in user_ids
+    }
+
+
+class StudentQueueListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        user_id = self.context["request"].user.id
+        return serialize_student_queues(annotate_queues(data), [user_id])[user_id]
+
+
+class StudentQueueSerializer(serializers.BaseSerializer):
+    """
+    Read only serializer for queues from the point of view of the requesting user, see
+    serialize_student_queues().
+    """
+
+    class Meta:
+        list_serializer_class = StudentQueueListSerializer
+
+    def to_representation(self, instance):
+        user_id = self.context["request"].user.id
+        queues = annotate_queues(Queue.objects.filter(id=instance.id))
+        return serialize_student_queues(queues, [user_id])[user_id][0]
+
+
+class QuestionEventSerializer(serializers.ModelSerializer):
+    """
+    Serializer for question events. Users are only included by id to keep the log compact.
+    """
+
+    class Meta:
+        model = QuestionEvent
+        fields = ("id", "question", "from_status", "to_status", "actor", "time")
+        read_only_fields = fields
+
+
+class QuestionTransitionSerializer(serializers.Serializer):
+    """
+    Serializer to move many questions to the same status at once.
+    """
+
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    status = serializers.ChoiceField(
+        choices=[
+            Question.STATUS_ASKED,
+            Question.STATUS_ACTIVE,
+            Question.STATUS_REJECTED,
+            Question.STATUS_ANSWERED,
+        ]
+    )
+    rejected_reason = serializers.CharField(max_length=255, required=False)
+
+    def validate(self, data):
+        if data["status"] == Question.STATUS_REJECTED and not data.get("rejected_reason"):
+            raise serializers.ValidationError(
+                detail={"detail": "Rejecting questions requires a rejected reason"}
+            )
+        return data
+
+
+class QuestionNextSerializer(serializers.Serializer):
+    """
+    Serializer for the tags a TA would prefer to answer when claiming the next question.
+    """
+
+    tags = serializers.ListField(child=serializers.CharField(max_length=255), required=False)
 
 
 class MembershipPrivateSerializer(CourseRouteMixin):
@@ -0,0 +1,96 @@
+import hashlib
+import random
+import re
+
+from django.core.cache import cache
+
+from ohq.models import Question
+
+
+# MinHash signatures are split into bands of rows. Two questions are candidates for being similar
+# if all rows of at least one band match, which happens with high probability once the Jaccard
+# similarity of their words is above roughly (1 / BANDS) ** (1 / ROWS), i.e. 0.5.
+BANDS = 16
+ROWS = 4
+MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0)
+PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(BANDS * ROWS)
+]
+
+# Questions stay open for a few hours at most
+INDEX_TIMEOUT = 60 * 60 * 24
+
+
+def index_key(queue_id, question_id):
+    return f"ohq:queue:{queue_id}:similarity:{question_id}"
+
+
+def _stable_hash(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def get_bands(text):
+    """
+    Get the LSH band hashes of the MinHash signature of the words in a question's text.
+    """
+
+    words = {word for word in re.findall(r"\w+", text.lower()) if len(word) > 2}
+    if not words:
+        return []
+
+    hashes = [_stable_hash(word.encode()) for word in words]
+    signature = [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+    bands = []
+    for start in range(0, BANDS * ROWS, ROWS):
+        rows = signature[start : start + ROWS]  # noqa: E203
+        bands.append(_stable_hash(b"".join(value.to_bytes(8, "big") for value in rows)))
+    return bands
+
+
+def index_question(question):
+    """
+    Add a question to (or update it in) the similarity index of its queue.
+    Only the question itself is hashed, so this doesn't depend on the size of the queue.
+    """
+
+    cache.set(index_key(question.queue_id, question.id), get_bands(question.text), INDEX_TIMEOUT)
+
+
+def group_similar_questions(queue_id, question_ids):
+    """
+    Group similar questions from a list of ids of questions in a queue.
+    Returns a list of groups of at least two question ids, in the order of the given ids.
+    Only the text of questions missing from the index is loaded, and they are indexed.
+    """
+
+    keys = {question_id: index_key(queue_id, question_id) for question_id in question_ids}
+    indexed = cache.get_many(keys.values())
+    missing = [question_id for question_id in question_ids if keys[question_id] not in indexed]
+    if missing:
+        texts = Question.objects.filter(id__in=missing).values_list("id", "text")
+        missing_bands = {keys[question_id]: get_bands(text) for question_id, text in texts}
+        cache.set_many(missing_bands, INDEX_TIMEOUT)
+        indexed.update(missing_bands)
+    bands = {question_id: indexed.get(keys[question_id], []) for question_id in question_ids}
+
+    # Union questions that share a bucket in any band
+    parents = {question_id: question_id for question_id in question_ids}
+
+    def find(question_id):
+        while parents[question_id] != question_id:
+            parents[question_id] = parents[parents[question_id]]
+            question_id = parents[question_id]
+        return question_id
+
+    buckets = {}
+    for question_id in question_ids:
+        for band, value in enumerate(bands[question_id]):
+            other_id = buckets.setdefault((band, value), question_id)
+            parents[find(question_id)] = find(other_id)
+
+    groups = {}
+    for question_id in question_ids:
+        groups.setdefault(find(question_id), []).append(question_id)
+    return [group for group in groups.values() if len(group) > 1]
@@ -1,19 +1,21 @@
 from django.urls import path
 from rest_framework_nested import routers
-from rest_live.routers import RealtimeRouter
 
+from ohq.realtime import RealtimeRouter
 from ohq.views import (
     AnnouncementViewSet,
     CourseViewSet,
     MassInviteView,
     MembershipInviteViewSet,
     MembershipViewSet,
+    QuestionEventViewSet,
     QuestionSearchView,
     QuestionViewSet,
     QueueStatisticView,
     QueueViewSet,
     ResendNotificationView,
     SemesterViewSet,
+    StudentQueueViewSet,
     TagViewSet,
     UserView,
 )
@@ -34,9 +36,13 @@ course_router.register("tags", TagViewSet, basename="tag")
 
 queue_router = routers.NestedSimpleRouter(course_router, "queues", lookup="queue")
 queue_router.register("questions", QuestionViewSet, basename="question")
+queue_router.register("events", QuestionEventViewSet, basename="event")
 
 realtime_router = RealtimeRouter()
 realtime_router.register(QuestionViewSet)
+realtime_router.register(QueueViewSet)
+realtime_router.register(AnnouncementViewSet)
+realtime_router.register(StudentQueueViewSet)
 
 additional_urls = [
     path("accounts/me/", UserView.as_view(), name="me"),
@@ -1,14 +1,15 @@
-import math
 import re
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.validators import ValidationError
-from django.db.models import Count, Exists, FloatField, IntegerField, OuterRef, Q, Subquery
-from django.http import HttpResponseBadRequest, JsonResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Value
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.utils import timezone
 from django.utils.crypto import get_random_string
-from django_auto_prefetching import prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_renderer_xlsx.mixins import XLSXFileMixin
 from drf_renderer_xlsx.renderers import XLSXRenderer
@@ -18,9 +19,17 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_live.mixins import RealtimeMixin
 
-from ohq.filters import QuestionSearchFilter, QueueStatisticFilter
+from ohq.cache import (
+    QUESTION_LIST_TIMEOUT,
+    conditional,
+    course_announcements_key,
+    get_course_tags,
+    get_stamps,
+    question_list_key,
+)
+from ohq.db.routers import use_replica
+from ohq.filters import QuestionEventFilter, QuestionSearchFilter, QueueStatisticFilter
 from ohq.invite import parse_and_send_invites
 from ohq.models import (
     Announcement,
@@ -28,12 +37,14 @@ from ohq.models import (
     Membership,
     MembershipInvite,
     Question,
+    QuestionEvent,
     Queue,
     QueueStatistic,
     Semester,
+    StudentQueue,
     Tag,
 )
-from ohq.pagination import QuestionSearchPagination
+from ohq.pagination import QuestionEventPagination, QuestionSearchPagination
 from ohq.permissions import (
     AnnouncementPermission,
     CoursePermission,
@@ -41,12 +52,24 @@ from ohq.permissions import (
     MassInvitePermission,
     MembershipInvitePermission,
     MembershipPermission,
+    QuestionEventPermission,
     QuestionPermission,
     QuestionSearchPermission,
     QueuePermission,
     QueueStatisticPermission,
     TagPermission,
+    get_membership,
+)
+from ohq.prefetching import prefetch
+from ohq.questions import (
+    annotate_positions,
+    annotate_positions_window,
+    bulk_transition,
+    get_question_version,
+    new_question_version,
 )
+from ohq.queues import annotate_queues, calculate_quota, get_quotas
+from ohq.realtime import GroupBroadcastMixin, RealtimeMixin, get_broadcast_group_name
 from ohq.schemas import MassInviteSchema
 from ohq.serializers import (
     AnnouncementSerializer,
@@ -55,13 +78,20 @@ from ohq.serializers import (
     MembershipInviteSerializer,
     MembershipSerializer,
     Profile,
+    QuestionEventSerializer,
+    QuestionNextSerializer,
     QuestionSerializer,
+    QuestionTransitionSerializer,
     QueueSerializer,
     QueueStatisticSerializer,
     SemesterSerializer,
+    StudentQueueSerializer,
     TagSerializer,
     UserPrivateSerializer,
+    serialize_questions,
+    serialize_student_queues,
 )
+from ohq.similarity import group_similar_questions
 from ohq.sms import sendSMSVerification
 
 
@@ -158,8 +188,64 @@ class CourseViewSet(viewsets.ModelViewSet):
         )
         return prefetch(qs, self.get_serializer_class())
 
+    @action(detail=True, url_path="queue-page")
+    def queue_page(self, request, pk=None):
+        """
+        Get everything a student's queue page shows with a fixed number of queries: the
+        queues of the course, your open questions with their positions, the last question
+        you asked in each queue, your quotas in rate limited queues, announcements, and tags.
+        Subscribe to the ohq.Queue, ohq.StudentQueue and ohq.Announcement lists of the course to
+        keep the page up to date.
+        """
+
+        course = self.get_object()
+        context = self.get_serializer_context()
+        queues = list(
+            annotate_queues(Queue.objects.filter(course=course, archived=False)).order_by("id")
+        )
+        questions = Question.objects.filter(queue__course=course, asked_by=request.user)
+
+        open_questions = annotate_positions(
+            questions.filter(status__in=[Question.STATUS_ASKED, Question.STATUS_ACTIVE])
+        ).order_by("time_asked")
+
+        last_questions = prefetch(
+            questions.filter(
+                status__in=[
+                    Question.STATUS_WITHDRAWN,
+                    Question.STATUS_REJECTED,
+                    Question.STATUS_ANSWERED,
+                ]
+            )
+            .order_by("queue", "-time_asked")
+            .distinct("queue"),
+            QuestionSerializer,
+        )
+
+        quotas = [
+            {"queue": queue_id, **quota}
+            for (queue_id, user_id), quota in get_quotas(queues, [request.user.id]).items()
+        ]
+
+        announcements = prefetch(Announcement.objects.filter(course=course), AnnouncementSerializer)
+
+        return Response(
+            {
+                "queues": QueueSerializer(queues, many=True, context=context).data,
+                "questions": serialize_questions(open_questions),
+                "last_questions": QuestionSerializer(
+                    last_questions, many=True, context=context
+                ).data,
+                "quotas": quotas,
+                "announcements": AnnouncementSerializer(
+                    announcements, many=True, context=context
+                ).data,
+                "tags": get_course_tags(course.id),
+            }
+        )
+
 
-class QuestionViewSet(viewsets.ModelViewSet, RealtimeMixin):
+class QuestionViewSet(viewsets.ModelViewSet, GroupBroadcastMixin, RealtimeMixin):
     """
     retrieve:
     Return a single question with all information fields present.
@@ -193,29 +279,106 @@ class QuestionViewSet(viewsets.ModelViewSet, RealtimeMixin):
             & (Q(status=Question.STATUS_ASKED) | Q(status=Question.STATUS_ACTIVE))
         ).order_by("time_asked")
 
-        membership = Membership.objects.get(course=self.kwargs["course_pk"], user=self.request.user)
+        membership = get_membership(self.request, self.kwargs["course_pk"])
+        if membership is None:
+            raise Membership.DoesNotExist
 
         if not membership.is_ta:
             qs = qs.filter(asked_by=self.request.user)
+
+        # The window function is only correct for the full staff list, so other lists (e.g. for
+        # students or realtime events) count the questions ahead of each question instead
+        if getattr(self, "position_window", False):
+            qs = annotate_positions_window(qs)
+        else:
+            qs = annotate_positions(qs)
         return prefetch(qs, self.serializer_class)
 
+    def get_broadcast_group_names(self):
+        """
+        TAs of a queue all see the same questions, while students only see their own.
+        """
+
+        queue_pk = self.kwargs["queue_pk"]
+        membership = get_membership(self.request, self.kwargs["course_pk"])
+        if membership is None:
+            return []
+        if membership.is_ta:
+            return [get_broadcast_group_name("ohq.Question", "queue", queue_pk, "staff")]
+        return [
+            get_broadcast_group_name(
+                "ohq.Question", "queue", queue_pk, "user", self.request.user.id
+            )
+        ]
+
+    @classmethod
+    def get_broadcast_kwargs(cls, instance):
+        return {"queue_pk": instance.queue_id}
+
+    @classmethod
+    def get_broadcasts(cls, instance_pks, view_kwargs):
+        """
+        Serialize the open questions among the changed questions once. The staff of the queue
+        receive all of them and each student that asked one of the questions receives their own.
+        """
+
+        queue_pk = view_kwargs["queue_pk"]
+        asked_by = dict(
+            Question.objects.filter(queue=queue_pk, pk__in=instance_pks).values_list(
+                "pk", "asked_by_id"
+            )
+        )
+        questions = annotate_positions(
+            Question.objects.filter(
+                queue=queue_pk,
+                pk__in=instance_pks,
+                status__in=[Question.STATUS_ASKED, Question.STATUS_ACTIVE],
+            ).order_by("time_asked")
+        )
+        data = serialize_questions(questions)
+
+        broadcasts = {get_broadcast_group_name("ohq.Question", "queue", queue_pk, "staff"): data}
+        for user_id in set(asked_by.values()):
+            broadcasts[
+                get_broadcast_group_name("ohq.Question", "queue", queue_pk, "user", user_id)
+            ] = [question for question in data if asked_by[question["id"]] == user_id]
+        return broadcasts
+
+    @classmethod
+    def get_related_broadcasts(cls, instance_pks, view_kwargs):
+        """
+        Student queue pages show the open and last questions of each student, so the askers
+        of the changed questions and the students whose positions or quotas moved receive their
+        view of the queue again.
+        """
+
+        queue_pk = int(view_kwargs["queue_pk"])
+        course_pk = Queue.objects.values_list("course", flat=True).get(pk=queue_pk)
+        asked_by = Question.objects.filter(queue=queue_pk, pk__in=instance_pks).values_list(
+            "asked_by", flat=True
+        )
+        student_kwargs = {"course_pk": course_pk}
+        broadcasts = StudentQueueViewSet.get_broadcasts(
+            [queue_pk], student_kwargs, user_ids=asked_by
+        )
+        return [("ohq.StudentQueue", [queue_pk], student_kwargs, broadcasts)]
+
     @action(detail=True)
+    @conditional(lambda view, request: get_stamps(f"queue:{view.kwargs['queue_pk']}:questions"))
     def position(self, request, course_pk, queue_pk, pk=None):
         """
         Get the position of a question within its queue.
         """
         question = self.get_object()
-        position = -1
-        if question.status == Question.STATUS_ASKED:
-            position = (
-                Question.objects.filter(
-                    queue=queue_pk, status=Question.STATUS_ASKED, time_asked__lt=question.time_asked
-                ).count()
-                + 1
-            )
+        position = question.position if question.status == Question.STATUS_ASKED else -1
         return JsonResponse({"position": position})
 
     @action(detail=False)
+    @conditional(
+        lambda view, request: "-".join(
+            [get_stamps(f"queue:{view.kwargs['queue_pk']}:questions"), str(request.user.id)]
+        )
+    )
     def last(self, request, course_pk, queue_pk):
         """
         Get the last question you asked in a queue. Only visible to Students.
@@ -236,12 +399,79 @@ class QuestionViewSet(viewsets.ModelViewSet, RealtimeMixin):
     def list(self, request, *args, **kwargs):
         """
         Update a staff member's last active time when they view questions
+
+        If the since query parameter is set to a question version, only return the open
+        questions that were inserted or changed and the ids of the questions that were removed
+        since that version, along with the version to sync from next. Questions can be returned
+        again by the next sync if they were written while this one ran.
         """
 
-        membership = Membership.objects.get(user=request.user, course=self.kwargs["course_pk"])
-        membership.last_active = timezone.now()
-        membership.save()
-        return super().list(request, *args, **kwargs)
+        membership = get_membership(request, self.kwargs["course_pk"])
+        # Updated in place since saving the membership would tell all of the user's websocket
+        # connections that their membership changed on every poll
+        Membership.objects.filter(pk=membership.pk).update(last_active=timezone.now())
+
+        since = request.query_params.get("since")
+        if since is None:
+            self.position_window = membership.is_ta
+            if membership.is_ta and request.accepted_renderer.format == "json":
+                return self.list_staff(request, *args, **kwargs)
+            return Response(serialize_questions(self.filter_queryset(self.get_queryset())))
+        if not since.isdigit():
+            return JsonResponse({"detail": "since must be a question version"}, status=400)
+
+        # Read the version first so that changes made while the questions are being read are
+        # returned again on the next sync rather than missed
+        version = get_question_version()
+        since = int(since)
+        questions = self.get_queryset().filter(modified_version__gt=since)
+        inserted = [question for question in questions if question.created_version > since]
+        changed = [question for question in questions if question.created_version <= since]
+        # Clients can have questions that were created after since, if an earlier sync returned
+        # them while they were being written, so every question closed since then is removed
+        removed = Question.objects.filter(
+            queue=self.kwargs["queue_pk"], modified_version__gt=since
+        ).exclude(status__in=[Question.STATUS_ASKED, Question.STATUS_ACTIVE])
+        if since == 0:
+            # Nothing to remove for clients that don't have any questions yet
+            removed = removed.none()
+        if not membership.is_ta:
+            removed = removed.filter(asked_by=request.user)
+
+        return Response(
+            {
+                "version": version,
+                "inserted": self.get_serializer(inserted, many=True).data,
+                "changed": self.get_serializer(changed, many=True).data,
+                "removed": list(removed.values_list("id", flat=True)),
+            }
+        )
+
+    def list_staff(self, request, *args, **kwargs):
+        """
+        Every TA in a queue gets the same list of questions, so the rendered JSON is shared
+        between them until the question stamp of the queue changes.
+        """
+
+        # Read the stamp first so that the list is never newer than the stamp it's cached under
+        stamp = get_stamps(f"queue:{self.kwargs['queue_pk']}:questions")
+        renderer = request.accepted_renderer
+        renderer_context = self.get_renderer_context()
+        # Only the default rendering is shared, not e.g. indented JSON asked for with an
+        # "Accept: application/json; indent=4" header
+        shared = not renderer.get_indent(request.accepted_media_type, renderer_context)
+        key = question_list_key(self.kwargs["queue_pk"], stamp)
+        content = cache.get(key) if shared else None
+        if content is None:
+            data = serialize_questions(self.filter_queryset(self.get_queryset()))
+            content = renderer.render(data, request.accepted_media_type, renderer_context)
+            if shared:
+                cache.set(key, content, QUESTION_LIST_TIMEOUT)
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        return HttpResponse(content, content_type=content_type)
 
     def quota_count_helper(self, queue, user):
         """
@@ -256,23 +486,150 @@ class QuestionViewSet(viewsets.ModelViewSet, RealtimeMixin):
 
     def create(self, request, *args, **kwargs):
         """
-        Create a new question and check if it follows the rate limit
+        Create a new question and check if it follows the rate limit.
+        The queue and its number of asked questions are fetched once and shared with
+        the serializer, and everything runs in a single transaction. Students asking a
+        second open question are rejected by the unique_open_question constraint.
+        """
+
+        try:
+            with transaction.atomic():
+                self.queue = (
+                    Queue.objects.select_related("course")
+                    .annotate(
+                        questions_asked=Count(
+                            "question", filter=Q(question__status=Question.STATUS_ASKED)
+                        )
+                    )
+                    .get(id=self.kwargs["queue_pk"])
+                )
+                if (
+                    self.queue.rate_limit_enabled
+                    and self.queue.questions_asked >= self.queue.rate_limit_length
+                ):
+                    num_questions_asked = self.quota_count_helper(self.queue, request.user).count()
+
+                    if num_questions_asked >= self.queue.rate_limit_questions:
+                        return JsonResponse({"detail": "rate limited"}, status=429)
+
+                return super().create(request, *args, **kwargs)
+        except IntegrityError as e:
+            # Other integrity errors aren't the student's fault
+            constraint = getattr(getattr(e.__cause__, "diag", None), "constraint_name", None)
+            if constraint != "unique_open_question":
+                raise
+            return JsonResponse({"detail": "you already have an open question"}, status=403)
+
+    def perform_create(self, serializer):
+        serializer.save(queue=self.queue)
+
+    @action(methods=["POST"], detail=False)
+    def transition(self, request, course_pk, queue_pk):
+        """
+        Move many open questions in a queue to the same status at once. Only visible to TAs.
+        """
+
+        serializer = QuestionTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        status = serializer.validated_data["status"]
+        now = timezone.now()
+
+        fields = {}
+        if status == Question.STATUS_ASKED:
+            fields = {"responded_to_by": None, "time_response_started": None}
+        elif status == Question.STATUS_ACTIVE:
+            fields = {"responded_to_by": request.user, "time_response_started": now}
+        elif status == Question.STATUS_REJECTED:
+            fields = {
+                "responded_to_by": request.user,
+                "time_response_started": now,
+                "time_responded_to": now,
+                "rejected_reason": serializer.validated_data["rejected_reason"],
+            }
+        elif status == Question.STATUS_ANSWERED:
+            # Keep the original responder of questions that were already being answered
+            fields = {
+                "responded_to_by": Coalesce("responded_to_by", Value(request.user.id)),
+                "time_response_started": Coalesce("time_response_started", Value(now)),
+                "time_responded_to": now,
+            }
+
+        questions = Question.objects.filter(
+            queue=queue_pk,
+            id__in=serializer.validated_data["ids"],
+            status__in=[Question.STATUS_ASKED, Question.STATUS_ACTIVE],
+        )
+        ids = bulk_transition(questions, status, actor=request.user, **fields)
+        return Response({"ids": ids})
+
+    @action(methods=["POST"], detail=False)
+    def next(self, request, course_pk, queue_pk):
+        """
+        Claim the oldest asked question in a queue, preferring questions with any of the given
+        tags. Questions that are being claimed by other TAs are skipped instead of waited on,
+        so concurrent TAs never get the same question. Only visible to TAs.
         """
 
-        queue = Queue.objects.get(id=self.kwargs["queue_pk"])
-        if (
-            queue.rate_limit_enabled
-            and Question.objects.filter(queue=queue, status=Question.STATUS_ASKED).count()
-            >= queue.rate_limit_length
-        ):
-            num_questions_asked = self.quota_count_helper(queue, request.user).count()
+        serializer = QuestionNextSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tags = serializer.validated_data.get("tags", [])
+
+        with transaction.atomic():
+            questions = Question.objects.filter(queue=queue_pk, status=Question.STATUS_ASKED)
+            if tags:
+                questions = questions.annotate(
+                    preferred=Exists(
+                        Question.tags.through.objects.filter(
+                            question=OuterRef("pk"), tag__name__in=tags
+                        )
+                    )
+                ).order_by("-preferred", "time_asked")
+            else:
+                questions = questions.order_by("time_asked")
+            question = questions.select_for_update(skip_locked=True, of=("self",)).first()
+            if question is None:
+                return JsonResponse({"detail": "no questions to answer"}, status=404)
+
+            QuestionEvent.objects.create(
+                question=question,
+                queue_id=question.queue_id,
+                from_status=Question.STATUS_ASKED,
+                to_status=Question.STATUS_ACTIVE,
+                actor=request.user,
+            )
+            question.status = Question.STATUS_ACTIVE
+            question.responded_to_by = request.user
+            question.time_response_started = timezone.now()
+            question.version += 1
+            question.modified_version = new_question_version(question.queue_id)
+            question.save()
 
-            if num_questions_asked >= queue.rate_limit_questions:
-                return JsonResponse({"detail": "rate limited"}, status=429)
+        return Response(self.get_serializer(question).data)
 
-        return super().create(request, *args, **kwargs)
+    @action(detail=False)
+    def similar(self, request, course_pk, queue_pk):
+        """
+        Get groups of similar asked questions in a queue, oldest first. Only visible to TAs.
+        """
+
+        question_ids = (
+            Question.objects.filter(queue=queue_pk, status=Question.STATUS_ASKED)
+            .order_by("time_asked")
+            .values_list("id", flat=True)
+        )
+        return Response(group_similar_questions(queue_pk, list(question_ids)))
 
     @action(detail=False)
+    @conditional(
+        lambda view, request: "-".join(
+            [
+                get_stamps(f"course:{view.kwargs['course_pk']}:queues"),
+                str(request.user.id),
+                # The quota and wait time also change as time passes
+                timezone.now().strftime("%Y%m%d%H%M"),
+            ]
+        )
+    )
     def quota_count(self, request, course_pk, queue_pk):
         """
         Get number of questions asked within rate limit period if it is set up for the queue
@@ -280,29 +637,46 @@ class QuestionViewSet(viewsets.ModelViewSet, RealtimeMixin):
 
         queue = Queue.objects.get(id=queue_pk)
         if queue.rate_limit_enabled:
-            questions = self.quota_count_helper(queue, request.user)
-            count = questions.count()
-
-            wait_time_mins = 0
-            if (
-                Question.objects.filter(queue=queue, status=Question.STATUS_ASKED).count()
-                >= queue.rate_limit_length
-                and count >= queue.rate_limit_questions
-            ):
-                last_question = questions.order_by("-time_responded_to")[
-                    queue.rate_limit_questions - 1
-                ]
-                wait_time_secs = (
-                    queue.rate_limit_minutes * 60
-                    - (timezone.now() - last_question.time_responded_to).total_seconds()
-                )
-                wait_time_mins = math.ceil(wait_time_secs / 60)
-
-            return JsonResponse({"count": count, "wait_time_mins": wait_time_mins})
+            times_responded_to = (
+                self.quota_count_helper(queue, request.user)
+                .order_by("-time_responded_to")
+                .values_list("time_responded_to", flat=True)
+            )
+            questions_asked = Question.objects.filter(
+                queue=queue, status=Question.STATUS_ASKED
+            ).count()
+            return JsonResponse(calculate_quota(queue, list(times_responded_to), questions_asked))
         else:
             return JsonResponse({"detail": "queue does not have rate limit"}, status=405)
 
 
+class QuestionEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    list:
+    Return the status transitions of questions in a queue, oldest first.
+    Use the since query parameter to only get events after the event with that id.
+    Students only get the events of their own questions. Results are paginated, follow the
+    next link to get more.
+
+    retrieve:
+    Return a single question event.
+    """
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = QuestionEventFilter
+    pagination_class = QuestionEventPagination
+    permission_classes = [QuestionEventPermission | IsSuperuser]
+    serializer_class = QuestionEventSerializer
+
+    def get_queryset(self):
+        qs = QuestionEvent.objects.filter(queue=self.kwargs["queue_pk"]).order_by("id")
+
+        membership = get_membership(self.request, self.kwargs["course_pk"])
+        if membership is None or not membership.is_ta:
+            qs = qs.filter(question__asked_by=self.request.user)
+        return qs
+
+
 class QuestionSearchView(XLSXFileMixin, generics.ListAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_class = QuestionSearchFilter
@@ -318,6 +692,11 @@ class QuestionSearchView(XLSXFileMixin, generics.ListAPIView):
         ).order_by("time_asked")
         return prefetch(qs, self.serializer_class)
 
+    @use_replica()
+    def list(self, request, *args, **kwargs):
+        # Permissions are checked before, against the primary
+        return super().list(request, *args, **kwargs)
+
     @property
     def paginator(self):
         """
@@ -332,7 +711,7 @@ class QuestionSearchView(XLSXFileMixin, generics.ListAPIView):
         return super().paginator
 
 
-class QueueViewSet(viewsets.ModelViewSet):
+class QueueViewSet(viewsets.ModelViewSet, GroupBroadcastMixin, RealtimeMixin):
     """
     retrieve:
     Return a single queue.
@@ -357,47 +736,49 @@ class QueueViewSet(viewsets.ModelViewSet):
 
     permission_classes = [QueuePermission | IsSuperuser]
     serializer_class = QueueSerializer
+    queryset = Queue.objects.none()
 
     def get_queryset(self):
+        qs = annotate_queues(
+            Queue.objects.filter(course=self.kwargs["course_pk"], archived=False)
+        ).order_by("id")
+        return prefetch(qs, self.serializer_class)
+
+    def get_broadcast_group_names(self):
         """
-        Annotate the number of questions asked, number of questioned currently being answered,
-        and the number of active staff members.
-        Filter/annotation pattern taken from here:
-        https://stackoverflow.com/questions/42543978/django-1-11-annotating-a-subquery-aggregate
+        Everyone in a course sees the same queues.
         """
 
-        questions = (
-            Question.objects.filter(queue=OuterRef("pk"))
-            .order_by()
-            .values("queue")
-            .annotate(count=Count("*"))
-            .values("count")
-        )
-        questions_active = questions.filter(status=Question.STATUS_ACTIVE)
-        questions_asked = questions.filter(status=Question.STATUS_ASKED)
-
-        time_threshold = timezone.now() - timedelta(minutes=1)
-        staff_active = (
-            Membership.objects.filter(
-                Q(course=OuterRef("course__pk"))
-                & ~Q(kind=Membership.KIND_STUDENT)
-                & Q(last_active__gt=time_threshold)
-            )
-            .order_by()
-            .values("course")
-            .annotate(count=Count("*", output_field=FloatField()),)
-            .values("count")
-        )
-        qs = (
-            Queue.objects.filter(course=self.kwargs["course_pk"], archived=False)
-            .annotate(
-                questions_active=Subquery(questions_active[:1], output_field=IntegerField()),
-                questions_asked=Subquery(questions_asked[:1]),
-                staff_active=Subquery(staff_active[:1]),
-            )
-            .order_by("id")
+        return [get_broadcast_group_name("ohq.Queue", "course", self.kwargs["course_pk"])]
+
+    @classmethod
+    def get_broadcast_kwargs(cls, instance):
+        return {"course_pk": instance.course_id}
+
+    @classmethod
+    def get_broadcasts(cls, instance_pks, view_kwargs):
+        """
+        Annotate and serialize the changed queues once for all of the course's subscribers.
+        """
+
+        course_pk = view_kwargs["course_pk"]
+        queues = annotate_queues(
+            Queue.objects.filter(course=course_pk, archived=False, pk__in=instance_pks)
+        ).order_by("id")
+        data = cls.serializer_class(prefetch(queues, cls.serializer_class), many=True).data
+        return {get_broadcast_group_name("ohq.Queue", "course", course_pk): data}
+
+    @conditional(
+        lambda view, request: "-".join(
+            [
+                get_stamps(f"course:{view.kwargs['course_pk']}:queues"),
+                # The number of active staff also changes as time passes
+                timezone.now().strftime("%Y%m%d%H%M"),
+            ]
         )
-        return prefetch(qs, self.serializer_class)
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     @action(methods=["POST"], detail=True)
     def clear(self, request, course_pk, pk=None):
@@ -405,14 +786,89 @@ class QueueViewSet(viewsets.ModelViewSet):
         Clear the queue by rejecting all questions which are currently open (in the asked state).
         """
         queue = self.get_object()
-        Question.objects.filter(queue=queue, status=Question.STATUS_ASKED).update(
-            status=Question.STATUS_REJECTED,
+        # No one is left in the queue afterwards, so there's no one to notify
+        bulk_transition(
+            Question.objects.filter(queue=queue, status=Question.STATUS_ASKED),
+            Question.STATUS_REJECTED,
+            notify=False,
+            actor=self.request.user,
             rejected_reason="OH_ENDED",
             responded_to_by=self.request.user,
         )
         return JsonResponse({"detail": "success"})
 
 
+class StudentQueueViewSet(viewsets.GenericViewSet, GroupBroadcastMixin, RealtimeMixin):
+    """
+    Realtime only view of the queues of a course from the point of view of the requesting user:
+    their open question in each queue with its position, the last question they asked in it
+    and their quota if it is rate limited. Keeps CourseViewSet.queue_page up to date.
+    """
+
+    permission_classes = [QueuePermission | IsSuperuser]
+    serializer_class = StudentQueueSerializer
+    queryset = StudentQueue.objects.none()
+
+    def get_queryset(self):
+        return StudentQueue.objects.filter(
+            course=self.kwargs["course_pk"], archived=False
+        ).order_by("id")
+
+    def get_broadcast_group_names(self):
+        """
+        Every user sees their own questions in the queues.
+        """
+
+        return [
+            get_broadcast_group_name(
+                "ohq.StudentQueue", "course", self.kwargs["course_pk"], "user", self.request.user.id
+            )
+        ]
+
+    @classmethod
+    def get_broadcast_kwargs(cls, instance):
+        return {"course_pk": instance.course_id}
+
+    @classmethod
+    def get_broadcasts(cls, instance_pks, view_kwargs, user_ids=()):
+        """
+        Serialize the changed queues for the given users and the students whose view of them
+        depends on the rest of the queue, i.e. those with open questions or with questions that
+        count towards their quota. Everyone else sees the same queues as before.
+        Quotas that expire as time passes aren't broadcast.
+        """
+
+        course_pk = view_kwargs["course_pk"]
+        queues = list(
+            annotate_queues(
+                Queue.objects.filter(course=course_pk, archived=False, pk__in=instance_pks)
+            ).order_by("id")
+        )
+        now = timezone.now()
+        affected = Q(status__in=[Question.STATUS_ASKED, Question.STATUS_ACTIVE])
+        for queue in queues:
+            if queue.rate_limit_enabled:
+                affected |= Q(
+                    queue=queue,
+                    time_responded_to__gte=now - timedelta(minutes=queue.rate_limit_minutes),
+                )
+        user_ids = {
+            *user_ids,
+            *Question.objects.filter(affected, queue__in=queues)
+            .order_by()
+            .values_list("asked_by", flat=True)
+            .distinct(),
+        }
+
+        data = serialize_student_queues(queues, sorted(user_ids))
+        return {
+            get_broadcast_group_name("ohq.StudentQueue", "course", course_pk, "user", user_id): (
+                data[user_id]
+            )
+            for user_id in user_ids
+        }
+
+
 class TagViewSet(viewsets.ModelViewSet):
     """
     retrieve:
@@ -443,6 +899,13 @@ class TagViewSet(viewsets.ModelViewSet):
         qs = Tag.objects.filter(course=self.kwargs["course_pk"])
         return prefetch(qs, self.serializer_class)
 
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the list of tags from the per-course tag cache.
+        """
+
+        return Response(get_course_tags(self.kwargs["course_pk"]))
+
 
 class MembershipViewSet(viewsets.ModelViewSet):
     """
@@ -574,8 +1037,12 @@ class QueueStatisticView(generics.ListAPIView):
         qs = QueueStatistic.objects.filter(queue=self.kwargs["queue_pk"])
         return prefetch(qs, self.serializer_class)
 
+    @use_replica()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(viewsets.ModelViewSet, RealtimeMixin):
     """
     retrieve:
     Return a single announcement.
@@ -600,6 +1067,27 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
 
     permission_classes = [AnnouncementPermission | IsSuperuser]
     serializer_class = AnnouncementSerializer
+    queryset = Announcement.objects.none()
 
     def get_queryset(self):
         return Announcement.objects.filter(course=self.kwargs["course_pk"])
+
+    @classmethod
+    def get_broadcast_kwargs(cls, instance):
+        return {"course_pk": instance.course_id}
+
+    @conditional(
+        lambda view, request: get_stamps(f"course:{view.kwargs['course_pk']}:announcements")
+    )
+    def list(self, request, *args, **kwargs):
+        """
+        Announcements rarely change, so the list is cached per course until an announcement
+        is created, modified, or deleted.
+        """
+
+        key = course_announcements_key(self.kwargs["course_pk"])
+        data = cache.get(key)
+        if data is None:
+            data = list(super().list(request, *args, **kwargs).data)
+            cache.set(key, data, None)
+        return Response(data)
@@ -0,0 +1,218 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ohq.cache import course_tags_key, get_course_tags
+from ohq.models import Announcement, Course, Membership, Question, Queue, Semester, Tag
+
+
+User = get_user_model()
+
+
+class CourseTagsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.tag = Tag.objects.create(name="Tag", course=self.course)
+
+    def test_cached(self):
+        self.assertEqual([{"id": self.tag.id, "name": "Tag"}], get_course_tags(self.course.id))
+        with self.assertNumQueries(0):
+            self.assertEqual([{"id": self.tag.id, "name": "Tag"}], get_course_tags(self.course.id))
+
+    def test_invalidate_create(self):
+        get_course_tags(self.course.id)
+        other = Tag.objects.create(name="Other", course=self.course)
+        self.assertEqual(
+            [{"id": self.tag.id, "name": "Tag"}, {"id": other.id, "name": "Other"}],
+            get_course_tags(self.course.id),
+        )
+
+    def test_invalidate_update(self):
+        get_course_tags(self.course.id)
+        self.tag.name = "Renamed"
+        self.tag.save()
+        self.assertEqual([{"id": self.tag.id, "name": "Renamed"}], get_course_tags(self.course.id))
+
+    def test_invalidate_delete(self):
+        get_course_tags(self.course.id)
+        self.tag.delete()
+        self.assertEqual([], get_course_tags(self.course.id))
+
+    @patch("ohq.cache.transaction.on_commit")
+    def test_invalidate_commit(self, mock_on_commit):
+        """
+        Tags cached again before the transaction commits are deleted once it does.
+        """
+
+        self.tag.name = "Renamed"
+        self.tag.save()
+        # Another request that can't see the change yet caches the old tags
+        cache.set(course_tags_key(self.course.id), [{"id": self.tag.id, "name": "Tag"}], None)
+        for call in mock_on_commit.call_args_list:
+            call[0][0]()
+        self.assertEqual([{"id": self.tag.id, "name": "Renamed"}], get_course_tags(self.course.id))
+
+
+class CourseAnnouncementsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.ta = User.objects.create(username="ta")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        self.announcement = Announcement.objects.create(
+            content="Announcement", author=self.ta, course=self.course
+        )
+        self.url = reverse("ohq:announcement-list", args=[self.course.id])
+        self.client.force_authenticate(user=self.ta)
+
+    def get_contents(self):
+        return [
+            announcement["content"]
+            for announcement in json.loads(self.client.get(self.url).content)
+        ]
+
+    def test_cached(self):
+        with CaptureQueriesContext(connection) as miss:
+            first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as hit:
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+        self.assertLess(len(hit), len(miss))
+
+    def test_invalidate_create(self):
+        self.get_contents()
+        Announcement.objects.create(content="Other", author=self.ta, course=self.course)
+        self.assertEqual({"Announcement", "Other"}, set(self.get_contents()))
+
+    def test_invalidate_update(self):
+        self.get_contents()
+        self.announcement.content = "Changed"
+        self.announcement.save()
+        self.assertEqual(["Changed"], self.get_contents())
+
+    def test_invalidate_delete(self):
+        self.get_contents()
+        self.announcement.delete()
+        self.assertEqual([], self.get_contents())
+
+
+@patch("ohq.serializers.sendUpNextNotificationTask.delay")
+class ConditionalGetTestCase(TransactionTestCase):
+    """
+    Version stamps are bumped when transactions commit, so these tests need real transactions.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(
+            name="Queue",
+            course=self.course,
+            rate_limit_enabled=True,
+            rate_limit_length=0,
+            rate_limit_minutes=20,
+            rate_limit_questions=1,
+        )
+        self.ta = User.objects.create(username="ta")
+        self.student = User.objects.create(username="student")
+        self.other_student = User.objects.create(username="other_student")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        Membership.objects.create(
+            course=self.course, user=self.other_student, kind=Membership.KIND_STUDENT
+        )
+        self.client.force_authenticate(user=self.student)
+        response = self.client.post(
+            reverse("ohq:question-list", args=[self.course.id, self.queue.id]),
+            {"text": "Help me", "tags": []},
+        )
+        self.question_id = json.loads(response.content)["id"]
+
+    def assertNotModified(self, url):
+        with CaptureQueriesContext(connection) as modified:
+            etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as not_modified:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertLess(len(not_modified), len(modified))
+        self.assertEqual(b"", response.content)
+        return etag
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response["ETag"])
+
+    def ask(self, user):
+        self.client.force_authenticate(user=user)
+        self.client.post(
+            reverse("ohq:question-list", args=[self.course.id, self.queue.id]),
+            {"text": "Help me", "tags": []},
+        )
+
+    def test_queues(self, mock_delay):
+        url = reverse("ohq:queue-list", args=[self.course.id])
+        etag = self.assertNotModified(url)
+        self.queue.description = "Changed"
+        self.queue.save()
+        self.assertModified(url, etag)
+
+        etag = self.assertNotModified(url)
+        self.ask(self.other_student)
+        self.assertModified(url, etag)
+
+    def test_announcements(self, mock_delay):
+        url = reverse("ohq:announcement-list", args=[self.course.id])
+        etag = self.assertNotModified(url)
+        Announcement.objects.create(content="Announcement", author=self.ta, course=self.course)
+        self.assertModified(url, etag)
+
+    def test_position(self, mock_delay):
+        url = reverse(
+            "ohq:question-position", args=[self.course.id, self.queue.id, self.question_id]
+        )
+        etag = self.assertNotModified(url)
+        self.client.force_authenticate(user=self.ta)
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, self.question_id]),
+            {"status": Question.STATUS_ACTIVE},
+        )
+        self.client.force_authenticate(user=self.student)
+        self.assertModified(url, etag)
+
+    def test_quota_count(self, mock_delay):
+        url = reverse("ohq:question-quota-count", args=[self.course.id, self.queue.id])
+        etag = self.assertNotModified(url)
+        self.client.force_authenticate(user=self.other_student)
+        self.assertEqual(200, self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+
+    def test_last(self, mock_delay):
+        """
+        The last question is different for each student, so their ETags are too.
+        """
+
+        url = reverse("ohq:question-last", args=[self.course.id, self.queue.id])
+        etag = self.assertNotModified(url)
+        self.client.force_authenticate(user=self.other_student)
+        self.assertEqual(200, self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
@@ -30,6 +30,14 @@ class CalculateWaitTimesTestCase(TestCase):
         self.assertEqual("Updated estimated queue wait times!\n", out.getvalue())
 
 
+class BenchmarkQuestionsTestCase(TestCase):
+    def test_call_command(self):
+        out = StringIO()
+        call_command("benchmarkquestions", "--count", "20", stdout=out)
+        self.assertIn("Speedup", out.getvalue())
+        self.assertFalse(Question.objects.exists())
+
+
 class RegisterClassTestCase(TestCase):
     def setUp(self):
         self.course = ("CIS", "160", "Math", "FALL", "2020")
@@ -115,7 +123,7 @@ class AverageQueueWaitTimeTestCase(TestCase):
                 asked_by=student,
                 responded_to_by=ta,
                 time_response_started=yesterday + timezone.timedelta(seconds=self.wait_times[i]),
-                status=Question.STATUS_ACTIVE,
+                status=Question.STATUS_ANSWERED,
             )
             q1.time_asked = yesterday
             q1.save()
@@ -155,7 +163,7 @@ class AverageQueueWaitTimeTestCase(TestCase):
             responded_to_by=ta,
             time_response_started=yesterday
             - timezone.timedelta(days=2, seconds=-self.old_time_wait),
-            status=Question.STATUS_ACTIVE,
+            status=Question.STATUS_ANSWERED,
         )
         q4.time_asked = yesterday - timezone.timedelta(days=2)
         q4.save()
@@ -435,7 +443,7 @@ class AverageQueueWaitHeatmapTestCase(TestCase):
                 asked_by=student,
                 responded_to_by=ta,
                 time_response_started=time_asked + timezone.timedelta(seconds=self.wait_times_9[i]),
-                status=Question.STATUS_ACTIVE,
+                status=Question.STATUS_ANSWERED,
             )
             question.time_asked = time_asked
             question.save()
@@ -455,7 +463,7 @@ class AverageQueueWaitHeatmapTestCase(TestCase):
                 responded_to_by=ta,
                 time_response_started=time_asked
                 + timezone.timedelta(seconds=self.wait_times_17[i]),
-                status=Question.STATUS_ACTIVE,
+                status=Question.STATUS_ANSWERED,
             )
             question.time_asked = time_asked
             question.save()
@@ -469,7 +477,7 @@ class AverageQueueWaitHeatmapTestCase(TestCase):
             responded_to_by=ta,
             time_response_started=yesterday_9
             - timezone.timedelta(weeks=2, days=2, seconds=-self.older_wait_time),
-            status=Question.STATUS_ACTIVE,
+            status=Question.STATUS_ANSWERED,
         )
         self.older.time_asked = yesterday_9 - timezone.timedelta(weeks=2, days=2)
         self.older.save()
@@ -549,7 +557,7 @@ class QuestionsPerTAQueueHeatmapTestCase(TestCase):
                 asked_by=student,
                 responded_to_by=ta1 if i % 2 == 0 else ta2,
                 time_response_started=time_asked + timezone.timedelta(minutes=10),
-                status=Question.STATUS_ACTIVE if i % 3 == 0 else Question.STATUS_ANSWERED,
+                status=Question.STATUS_REJECTED if i % 3 == 0 else Question.STATUS_ANSWERED,
             )
             question.time_asked = time_asked
             question.save()
@@ -565,7 +573,7 @@ class QuestionsPerTAQueueHeatmapTestCase(TestCase):
                 asked_by=student,
                 responded_to_by=ta1 if i < self.ta_1_questions_17 else ta2,
                 time_response_started=time_asked + timezone.timedelta(minutes=10),
-                status=Question.STATUS_ACTIVE if i % 3 == 0 else Question.STATUS_ANSWERED,
+                status=Question.STATUS_REJECTED if i % 3 == 0 else Question.STATUS_ANSWERED,
             )
             question.time_asked = time_asked
             question.save()
@@ -579,7 +587,7 @@ class QuestionsPerTAQueueHeatmapTestCase(TestCase):
                 text=f"Question {i}",
                 queue=self.queue,
                 asked_by=student,
-                status=Question.STATUS_ASKED,
+                status=Question.STATUS_WITHDRAWN,
             )
             question.time_asked = time_asked
             question.save()
@@ -593,7 +601,7 @@ class QuestionsPerTAQueueHeatmapTestCase(TestCase):
             asked_by=student,
             responded_to_by=ta2,
             time_response_started=self.older_time_asked + timezone.timedelta(minutes=5),
-            status=Question.STATUS_ACTIVE,
+            status=Question.STATUS_ANSWERED,
         )
         older.time_asked = self.older_time_asked
         older.save()
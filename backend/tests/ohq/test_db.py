@@ -0,0 +1,150 @@
+from unittest.mock import patch
+
+import psycopg2
+from django.db import OperationalError, connection
+from django.test import TestCase
+
+from ohq.db.base import DatabaseWrapper, close_pools
+
+
+class ConnectionPoolTestCase(TestCase):
+    def setUp(self):
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        close_pools()
+
+    def get_wrapper(self, size=1):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, "POOL": {"SIZE": size, "TIMEOUT": 0.1}},
+            # Pools are shared by the connections with the same alias
+            alias=self.id(),
+        )
+        self.wrappers.append(wrapper)
+        return wrapper
+
+    def reconnect(self, wrapper):
+        wrapper.close()
+        wrapper.ensure_connection()
+        return wrapper.connection
+
+    def test_reuse(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        pooled = wrapper.connection
+        self.assertIs(pooled, self.reconnect(wrapper))
+        wrapper.close()
+        self.assertIs(pooled, self.reconnect(self.get_wrapper()))
+
+    def test_exhausted(self):
+        self.get_wrapper().ensure_connection()
+        with self.assertRaises(OperationalError):
+            self.get_wrapper().ensure_connection()
+
+    def test_size(self):
+        first = self.get_wrapper(size=2)
+        second = self.get_wrapper(size=2)
+        first.ensure_connection()
+        second.ensure_connection()
+        self.assertIsNot(first.connection, second.connection)
+
+    def test_rollback(self):
+        """
+        Transactions that are still open when a connection is returned are rolled back.
+        """
+
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TEMPORARY TABLE pooled (id integer)")
+        pooled = self.reconnect(wrapper)
+        self.assertIs(pooled, wrapper.connection)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_tables WHERE tablename = 'pooled'")
+            self.assertEqual((0,), cursor.fetchone())
+
+    def test_reset(self):
+        """
+        Session state is discarded when a connection is returned to the pool.
+        """
+
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute("CREATE TEMPORARY TABLE pooled (id integer)")
+            cursor.execute("SET application_name = 'pooled'")
+            cursor.execute("SELECT pg_advisory_lock(1)")
+        pooled = self.reconnect(wrapper)
+        self.assertIs(pooled, wrapper.connection)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_tables WHERE tablename = 'pooled'")
+            self.assertEqual((0,), cursor.fetchone())
+            cursor.execute("SHOW application_name")
+            self.assertNotEqual(("pooled",), cursor.fetchone())
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'")
+            self.assertEqual((0,), cursor.fetchone())
+
+    def test_reset_error(self):
+        """
+        Connections whose session state can't be reset are closed instead of being reused.
+        """
+
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        pooled = wrapper.connection
+        with patch.object(wrapper.pool, "reset", side_effect=psycopg2.OperationalError):
+            wrapper.close()
+        self.assertTrue(pooled.closed)
+        self.assertIsNot(pooled, self.reconnect(wrapper))
+
+    def test_closed(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        pooled = wrapper.connection
+        pooled.close()
+        connection = self.reconnect(wrapper)
+        self.assertIsNot(pooled, connection)
+        self.assertFalse(connection.closed)
+
+    def test_atomic_close(self):
+        """
+        Connections closed in a transaction aren't reused, since Django keeps using them.
+        """
+
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        pooled = wrapper.connection
+        with patch.object(wrapper, "in_atomic_block", True):
+            wrapper.close()
+        self.assertTrue(pooled.closed)
+        # Like at the end of the transaction
+        wrapper.connection = None
+        wrapper.closed_in_transaction = False
+        self.assertIsNot(pooled, self.reconnect(wrapper))
+
+    @patch("ohq.db.base.HEALTH_CHECK_AFTER", 0)
+    def test_health_check(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        pooled = wrapper.connection
+        self.assertIs(pooled, self.reconnect(wrapper))
+
+        # The server drops the connection while it is idle
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [pooled.get_backend_pid()])
+        wrapper.ensure_connection()
+        self.assertIsNot(pooled, wrapper.connection)
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    def test_close_pools(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        pooled = wrapper.connection
+        wrapper.close()
+        close_pools(connection.settings_dict["NAME"])
+        self.assertTrue(pooled.closed)
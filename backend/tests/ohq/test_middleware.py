@@ -0,0 +1,149 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from accounts.settings import accounts_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ohq.middleware import token_key
+
+
+User = get_user_model()
+
+
+class Platform(ThreadingHTTPServer):
+    """
+    Local stand-in for platform's token introspection endpoint.
+    """
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), PlatformHandler)
+        self.responses = {}
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class PlatformHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        token = self.headers["Authorization"].split(" ", 1)[1]
+        self.server.requests.append(token)
+        status, body = self.server.responses.get(token, (401, {"detail": "Invalid token"}))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OAuth2TokenMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.platform = Platform()
+        thread = threading.Thread(
+            target=self.platform.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+        )
+        thread.start()
+        self.addCleanup(self.platform.server_close)
+        self.addCleanup(self.platform.shutdown)
+        patcher = patch.object(accounts_settings, "PLATFORM_URL", self.platform.url)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.set_token("token", exp=timezone.now().timestamp() + 60 * 60)
+
+    def set_token(self, token, exp):
+        self.platform.responses[token] = (
+            200,
+            {
+                "exp": exp,
+                "user": {
+                    "pennid": 1,
+                    "username": "student",
+                    "first_name": "First",
+                    "last_name": "Last",
+                    "email": "student@seas.upenn.edu",
+                    "user_permissions": [],
+                    "groups": [],
+                },
+            },
+        )
+
+    def get(self, token):
+        return self.client.get(reverse("ohq:me"), HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_valid_token(self):
+        for i in range(2):
+            response = self.get("token")
+            self.assertEqual(200, response.status_code)
+            self.assertEqual("student", response.json()["username"])
+        self.assertEqual(["token"], self.platform.requests)
+        self.assertTrue(User.objects.filter(id=1).exists())
+
+    def test_expired_token(self):
+        """
+        Tokens that have already expired when they are validated aren't cached.
+        """
+
+        self.set_token("expiring", exp=timezone.now().timestamp() - 1)
+        for i in range(2):
+            self.assertEqual(200, self.get("expiring").status_code)
+        self.assertEqual(["expiring", "expiring"], self.platform.requests)
+
+    @patch("ohq.middleware.TOKEN_TIMEOUT", 0)
+    def test_timeout(self):
+        for i in range(2):
+            self.assertEqual(200, self.get("token").status_code)
+        self.assertEqual(["token", "token"], self.platform.requests)
+
+    def test_invalid_token(self):
+        for i in range(2):
+            self.assertEqual(403, self.get("invalid").status_code)
+        self.assertEqual(["invalid"], self.platform.requests)
+
+    def test_platform_error(self):
+        """
+        Tokens aren't cached as invalid when platform fails.
+        """
+
+        self.platform.responses["token"] = (500, {})
+        for i in range(2):
+            self.assertEqual(403, self.get("token").status_code)
+        self.assertEqual(["token", "token"], self.platform.requests)
+
+    def test_platform_down(self):
+        self.platform.shutdown()
+        self.platform.server_close()
+        self.assertEqual(403, self.get("token").status_code)
+        self.assertIsNone(cache.get(token_key("token")))
+
+    def test_inactive_user(self):
+        self.assertEqual(200, self.get("token").status_code)
+        User.objects.filter(id=1).update(is_active=False)
+        self.assertEqual(500, self.get("token").status_code)
+        self.assertEqual(["token", "token"], self.platform.requests)
+
+    def test_tokens(self):
+        """
+        Each token is cached separately.
+        """
+
+        self.set_token("other", exp=timezone.now().timestamp() + 60 * 60)
+        for token in ["token", "other", "token", "other"]:
+            self.assertEqual(200, self.get(token).status_code)
+        self.assertEqual(["token", "other"], self.platform.requests)
+
+    def test_not_bearer(self):
+        response = self.client.get(reverse("ohq:me"), HTTP_AUTHORIZATION="Basic token")
+        self.assertEqual(403, response.status_code)
+        self.assertEqual([], self.platform.requests)
@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.db import IntegrityError
 from django.test import TestCase
 from django.utils import timezone
 
@@ -129,14 +130,26 @@ class QuestionTestCase(TestCase):
         course = Course.objects.create(
             course_code="000", department="TEST", course_title="Title", semester=semester
         )
-        queue = Queue.objects.create(name="Queue", course=course)
-        user = User.objects.create(username="user", email="example@example.com")
-        self.question = Question.objects.create(text="Question?", queue=queue, asked_by=user)
+        self.queue = Queue.objects.create(name="Queue", course=course)
+        self.user = User.objects.create(username="user", email="example@example.com")
+        self.question = Question.objects.create(
+            text="Question?", queue=self.queue, asked_by=self.user
+        )
 
     def test_str(self):
         # TODO: write this
         pass
 
+    def test_unique_open_question(self):
+        with self.assertRaises(IntegrityError):
+            Question.objects.create(text="Another?", queue=self.queue, asked_by=self.user)
+
+    def test_unique_open_question_closed(self):
+        self.question.status = Question.STATUS_ANSWERED
+        self.question.save()
+        Question.objects.create(text="Another?", queue=self.queue, asked_by=self.user)
+        self.assertEqual(2, Question.objects.filter(asked_by=self.user).count())
+
 
 class SemesterTestCase(TestCase):
     def setUp(self):
@@ -12,6 +12,7 @@ from ohq.models import (
     Membership,
     MembershipInvite,
     Question,
+    QuestionEvent,
     Queue,
     Semester,
     Tag,
@@ -126,6 +127,14 @@ class CourseTestCase(TestCase):
                 "non_member": 403,
                 "anonymous": 403,
             },
+            "queue-page": {
+                "professor": 200,
+                "head_ta": 200,
+                "ta": 200,
+                "student": 200,
+                "non_member": 403,
+                "anonymous": 403,
+            },
         }
 
     @parameterized.expand(users, name_func=get_test_name)
@@ -168,6 +177,16 @@ class CourseTestCase(TestCase):
             {"description": "new"},
         )
 
+    @parameterized.expand(users, name_func=get_test_name)
+    def test_queue_page(self, user):
+        test(
+            self,
+            user,
+            "queue-page",
+            "get",
+            reverse("ohq:course-queue-page", args=[self.course.id]),
+        )
+
     @parameterized.expand(users, name_func=get_test_name)
     def test_modify_archived(self, user):
         """
@@ -489,6 +508,30 @@ class QuestionTestCase(TestCase):
             },
             "modify-tag-existing": {"student": 200},
             "modify-tag-new": {"student": 200},
+            "transition": {
+                "professor": 200,
+                "head_ta": 200,
+                "ta": 200,
+                "student": 403,
+                "non_member": 403,
+                "anonymous": 403,
+            },
+            "next": {
+                "professor": 200,
+                "head_ta": 200,
+                "ta": 200,
+                "student": 403,
+                "non_member": 403,
+                "anonymous": 403,
+            },
+            "similar": {
+                "professor": 200,
+                "head_ta": 200,
+                "ta": 200,
+                "student": 403,
+                "non_member": 403,
+                "anonymous": 403,
+            },
         }
 
     @parameterized.expand(users, name_func=get_test_name)
@@ -545,7 +588,7 @@ class QuestionTestCase(TestCase):
             "create-existing",
             "post",
             reverse("ohq:question-list", args=[self.course.id, self.queue.id]),
-            {"text": "question"},
+            {"text": "question", "tags": []},
         )
 
     @parameterized.expand(users, name_func=get_test_name)
@@ -628,6 +671,39 @@ class QuestionTestCase(TestCase):
         else:
             mock_delay.assert_not_called()
 
+    @parameterized.expand(users, name_func=get_test_name)
+    @patch("ohq.questions.sendUpNextNotificationTask.delay")
+    def test_transition(self, user, mock_delay):
+        test(
+            self,
+            user,
+            "transition",
+            "post",
+            reverse("ohq:question-transition", args=[self.course.id, self.queue.id]),
+            {"ids": [self.question.id], "status": Question.STATUS_ANSWERED},
+        )
+
+    @parameterized.expand(users, name_func=get_test_name)
+    def test_next(self, user):
+        test(
+            self,
+            user,
+            "next",
+            "post",
+            reverse("ohq:question-next", args=[self.course.id, self.queue.id]),
+            {},
+        )
+
+    @parameterized.expand(users, name_func=get_test_name)
+    def test_similar(self, user):
+        test(
+            self,
+            user,
+            "similar",
+            "get",
+            reverse("ohq:question-similar", args=[self.course.id, self.queue.id]),
+        )
+
     def test_create_existing_tag(self):
         """
         Ensure a student can create a question with existing tags.
@@ -714,6 +790,59 @@ class QuestionSearchTestCase(TestCase):
         )
 
 
+class QuestionEventTestCase(TestCase):
+    def setUp(self):
+        setUp(self)
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.question = Question.objects.create(queue=self.queue, asked_by=self.student)
+        self.event = QuestionEvent.objects.create(
+            question=self.question,
+            queue=self.queue,
+            to_status=Question.STATUS_ASKED,
+            actor=self.student,
+        )
+
+        # Expected results
+        self.expected = {
+            "list": {
+                "professor": 200,
+                "head_ta": 200,
+                "ta": 200,
+                "student": 200,
+                "non_member": 403,
+                "anonymous": 403,
+            },
+            "retrieve": {
+                "professor": 200,
+                "head_ta": 200,
+                "ta": 200,
+                "student": 200,
+                "non_member": 403,
+                "anonymous": 403,
+            },
+        }
+
+    @parameterized.expand(users, name_func=get_test_name)
+    def test_list(self, user):
+        test(
+            self,
+            user,
+            "list",
+            "get",
+            reverse("ohq:event-list", args=[self.course.id, self.queue.id]),
+        )
+
+    @parameterized.expand(users, name_func=get_test_name)
+    def test_retrieve(self, user):
+        test(
+            self,
+            user,
+            "retrieve",
+            "get",
+            reverse("ohq:event-detail", args=[self.course.id, self.queue.id, self.event.id]),
+        )
+
+
 class MembershipTestCase(TestCase):
     def setUp(self):
         setUp(self)
@@ -0,0 +1,82 @@
+import inspect
+from unittest.mock import patch
+
+import django_auto_prefetching
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ohq import views
+from ohq.models import Announcement, Course, Membership, Question, Queue, Semester, Tag
+from ohq.prefetching import get_prefetch_plan, prefetch
+from ohq.serializers import (
+    AnnouncementSerializer,
+    MembershipSerializer,
+    QuestionSerializer,
+    QueueSerializer,
+)
+
+
+User = get_user_model()
+
+
+class PrefetchTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        queue = Queue.objects.create(name="Queue", course=self.course)
+        ta = User.objects.create(username="ta")
+        Membership.objects.create(course=self.course, user=ta, kind=Membership.KIND_TA)
+        tag = Tag.objects.create(name="Tag", course=self.course)
+        for i in range(3):
+            student = User.objects.create(username=f"student{i}")
+            Membership.objects.create(course=self.course, user=student)
+            question = Question.objects.create(
+                queue=queue, asked_by=student, text="Question", responded_to_by=ta
+            )
+            question.tags.add(tag)
+            Announcement.objects.create(course=self.course, author=ta, content="Announcement")
+
+    def test_plans_match(self):
+        """
+        Cached plans match the lookups django_auto_prefetching derives for every view.
+        """
+
+        for _, view in inspect.getmembers(views, inspect.isclass):
+            serializer_class = getattr(view, "serializer_class", None)
+            if view.__module__ != views.__name__ or serializer_class is None:
+                continue
+            select_related, prefetch_related = django_auto_prefetching._prefetch(serializer_class)
+            plan = get_prefetch_plan(serializer_class)
+            self.assertEqual((select_related, prefetch_related), tuple(map(set, plan)))
+
+    def test_num_queries(self):
+        """
+        Serializing querysets prefetched with cached plans takes the same number of queries.
+        """
+
+        for model, serializer_class in [
+            (Question, QuestionSerializer),
+            (Queue, QueueSerializer),
+            (Membership, MembershipSerializer),
+            (Announcement, AnnouncementSerializer),
+        ]:
+            with CaptureQueriesContext(connection) as expected:
+                serializer_class(
+                    django_auto_prefetching.prefetch(model.objects.all(), serializer_class),
+                    many=True,
+                ).data
+            with self.assertNumQueries(len(expected)):
+                serializer_class(prefetch(model.objects.all(), serializer_class), many=True).data
+
+    def test_cached(self):
+        get_prefetch_plan.cache_clear()
+        with patch(
+            "ohq.prefetching._prefetch", wraps=django_auto_prefetching._prefetch
+        ) as mock_prefetch:
+            prefetch(Question.objects.all(), QuestionSerializer)
+            prefetch(Question.objects.all(), QuestionSerializer)
+        mock_prefetch.assert_called_once_with(QuestionSerializer)
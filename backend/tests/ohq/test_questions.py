@@ -0,0 +1,157 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from ohq.models import Course, Question, QuestionEvent, Queue, Semester
+from ohq.questions import bulk_transition, get_question_version, new_question_version
+
+
+User = get_user_model()
+
+
+@patch("ohq.questions.sendUpNextNotificationTask.delay")
+@patch("ohq.questions.broadcast_bulk_update")
+class BulkTransitionTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=course)
+        self.queue2 = Queue.objects.create(name="Queue2", course=course)
+        self.ta = User.objects.create(username="ta")
+        self.questions = []
+        for i in range(3):
+            student = User.objects.create(username=f"student{i}")
+            self.questions.append(
+                Question.objects.create(queue=self.queue, asked_by=student, text="Help")
+            )
+            Question.objects.create(queue=self.queue2, asked_by=student, text="Help")
+
+    def test_transition(self, mock_broadcast, mock_delay):
+        with self.assertNumQueries(6):
+            ids = bulk_transition(
+                Question.objects.filter(queue=self.queue),
+                Question.STATUS_REJECTED,
+                actor=self.ta,
+                rejected_reason="OH_ENDED",
+                responded_to_by=self.ta,
+            )
+
+        self.assertEqual({question.id for question in self.questions}, set(ids))
+        for question in self.questions:
+            question.refresh_from_db()
+            self.assertEqual(Question.STATUS_REJECTED, question.status)
+            self.assertEqual("OH_ENDED", question.rejected_reason)
+            self.assertEqual(self.ta, question.responded_to_by)
+        self.assertEqual(
+            3, Question.objects.filter(queue=self.queue2, status=Question.STATUS_ASKED).count()
+        )
+        self.assertEqual(
+            {(question_id, Question.STATUS_ASKED, Question.STATUS_REJECTED) for question_id in ids},
+            set(
+                QuestionEvent.objects.filter(actor=self.ta).values_list(
+                    "question", "from_status", "to_status"
+                )
+            ),
+        )
+
+        mock_broadcast.assert_called_once()
+        self.assertEqual(set(ids), set(mock_broadcast.call_args[0][1]))
+        self.assertEqual({"queue_pk": self.queue.id}, mock_broadcast.call_args[1]["view_kwargs"])
+        mock_delay.assert_called_once_with(self.queue.id)
+
+    def test_transition_many_queues(self, mock_broadcast, mock_delay):
+        bulk_transition(Question.objects.all(), Question.STATUS_ANSWERED)
+        self.assertEqual(2, mock_broadcast.call_count)
+        self.assertEqual(2, mock_delay.call_count)
+
+    def test_transition_no_notify(self, mock_broadcast, mock_delay):
+        bulk_transition(Question.objects.all(), Question.STATUS_REJECTED, notify=False)
+        self.assertEqual(2, mock_broadcast.call_count)
+        mock_delay.assert_not_called()
+
+    def test_transition_active(self, mock_broadcast, mock_delay):
+        bulk_transition(Question.objects.filter(queue=self.queue), Question.STATUS_ACTIVE)
+        mock_broadcast.assert_called_once()
+        mock_delay.assert_not_called()
+
+    def test_transition_empty(self, mock_broadcast, mock_delay):
+        self.assertEqual([], bulk_transition(Question.objects.none(), Question.STATUS_REJECTED))
+        mock_broadcast.assert_not_called()
+        mock_delay.assert_not_called()
+
+    @patch("ohq.questions.transaction.on_commit", side_effect=lambda func: func())
+    def test_new_question_version(self, mock_on_commit, mock_broadcast, mock_delay):
+        version = new_question_version(self.queue.id)
+        # Writes in the same transaction get the same version
+        self.assertEqual(version, new_question_version(self.queue2.id))
+        self.assertLess(get_question_version(), version)
+        mock_broadcast.assert_called_with(
+            Queue, [self.queue2.id], view_kwargs={"course_pk": self.queue.course_id}
+        )
+
+
+class QuestionVersionTestCase(TransactionTestCase):
+    """
+    Question versions are transaction ids, so these tests need real transactions.
+    """
+
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=course)
+        self.student = User.objects.create(username="student")
+
+    def test_committed(self):
+        with transaction.atomic():
+            version = new_question_version(self.queue.id)
+        self.assertGreaterEqual(get_question_version(), version)
+        with transaction.atomic():
+            self.assertLess(version, new_question_version(self.queue.id))
+
+    def test_concurrent_writes(self):
+        """
+        Writes to the same queue don't wait for each other, and the version a sync reports
+        stays behind writes that are still in progress.
+        """
+
+        started = threading.Event()
+        finish = threading.Event()
+        versions = []
+
+        def write():
+            try:
+                with transaction.atomic():
+                    versions.append(new_question_version(self.queue.id))
+                    Question.objects.create(
+                        queue=self.queue,
+                        asked_by=self.student,
+                        text="Question",
+                        created_version=versions[0],
+                        modified_version=versions[0],
+                    )
+                    started.set()
+                    finish.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            self.assertTrue(started.wait(5))
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '1s'")
+                version = new_question_version(self.queue.id)
+            self.assertGreater(version, versions[0])
+            self.assertLess(get_question_version(), versions[0])
+        finally:
+            finish.set()
+            thread.join()
+        self.assertGreaterEqual(get_question_version(), version)
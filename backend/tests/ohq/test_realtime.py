@@ -0,0 +1,781 @@
+import json
+from unittest.mock import AsyncMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_live import CREATED, DELETED, UPDATED, get_group_name
+from rest_live.consumers import Subscription
+
+from ohq.models import Announcement, Course, Membership, Question, Queue, Semester
+from ohq.realtime import broadcast_bulk_update, get_broadcast_group_name, get_membership_group_name
+from ohq.urls import realtime_router
+from ohq.views import AnnouncementViewSet, QuestionViewSet, QueueViewSet, StudentQueueViewSet
+
+
+User = get_user_model()
+
+group_name = get_group_name("ohq.Question")
+
+
+class BulkSubscriptionConsumerTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.other_queue = Queue.objects.create(name="Other", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        self.student = User.objects.create(username="student")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        self.asked = Question.objects.create(queue=self.queue, asked_by=self.student, text="1")
+        self.rejected = Question.objects.create(
+            queue=self.queue, asked_by=self.ta, text="2", status=Question.STATUS_REJECTED
+        )
+
+    def get_consumer(self, user, view_kwargs, pks_in_queryset):
+        consumer = realtime_router.as_consumer()(
+            {
+                "type": "websocket",
+                "path": "/api/ws/subscribe/",
+                "headers": [],
+                "query_string": b"",
+                "user": user,
+            }
+        )
+        consumer.subscriptions = {
+            group_name: [
+                Subscription(
+                    request_id=1,
+                    action="list",
+                    view_kwargs=view_kwargs,
+                    query_params={},
+                    pks_in_queryset=set(pks_in_queryset),
+                )
+            ]
+        }
+        return consumer
+
+    def send_event(self, consumer, view_kwargs):
+        with patch.object(consumer, "send_broadcast") as mock_send:
+            consumer.models_saved(
+                {
+                    "type": "models.saved",
+                    "model": "ohq.Question",
+                    "instance_pks": [self.asked.id, self.rejected.id],
+                    "view_kwargs": view_kwargs,
+                    "channel_name": group_name,
+                }
+            )
+        return {call[0][2]: call[0][3] for call in mock_send.call_args_list}
+
+    def test_bulk_event(self):
+        view_kwargs = {"course_pk": self.course.id, "queue_pk": self.queue.id}
+        consumer = self.get_consumer(self.ta, view_kwargs, [self.rejected.id])
+        broadcasts = self.send_event(consumer, {"queue_pk": self.queue.id})
+        self.assertEqual(self.asked.id, broadcasts[CREATED]["id"])
+        self.assertEqual({"pk": self.rejected.id, "id": self.rejected.id}, broadcasts[DELETED])
+        self.assertNotIn(UPDATED, broadcasts)
+        self.assertEqual({self.asked.id}, consumer.subscriptions[group_name][0].pks_in_queryset)
+
+    def test_bulk_event_student(self):
+        """
+        Students only receive broadcasts for their own questions.
+        """
+
+        view_kwargs = {"course_pk": self.course.id, "queue_pk": self.queue.id}
+        consumer = self.get_consumer(self.student, view_kwargs, [self.asked.id])
+        broadcasts = self.send_event(consumer, {"queue_pk": self.queue.id})
+        self.assertEqual({UPDATED}, set(broadcasts))
+        self.assertEqual(self.asked.id, broadcasts[UPDATED]["id"])
+
+    def test_bulk_event_other_queue(self):
+        """
+        Subscriptions to other queues don't evaluate the event.
+        """
+
+        view_kwargs = {"course_pk": self.course.id, "queue_pk": self.other_queue.id}
+        consumer = self.get_consumer(self.ta, view_kwargs, [])
+        with self.assertNumQueries(0):
+            broadcasts = self.send_event(consumer, {"queue_pk": self.queue.id})
+        self.assertEqual({}, broadcasts)
+
+    def test_identical_subscriptions(self):
+        """
+        Identical subscriptions on one connection are evaluated once.
+        """
+
+        view_kwargs = {"course_pk": self.course.id, "queue_pk": self.queue.id}
+        consumer = self.get_consumer(self.ta, view_kwargs, [])
+        with CaptureQueriesContext(connection) as single:
+            self.send_event(consumer, {"queue_pk": self.queue.id})
+
+        consumer = self.get_consumer(self.ta, view_kwargs, [])
+        consumer.subscriptions[group_name].append(
+            Subscription(
+                request_id=2,
+                action="list",
+                view_kwargs={"course_pk": str(self.course.id), "queue_pk": str(self.queue.id)},
+                query_params={},
+                pks_in_queryset=set(),
+            )
+        )
+        with self.assertNumQueries(len(single)):
+            with patch.object(consumer, "send_broadcast") as mock_send:
+                consumer.models_saved(
+                    {
+                        "type": "models.saved",
+                        "model": "ohq.Question",
+                        "instance_pks": [self.asked.id],
+                        "view_kwargs": {"queue_pk": self.queue.id},
+                        "channel_name": group_name,
+                    }
+                )
+        self.assertEqual([1, 2], [call[0][0] for call in mock_send.call_args_list])
+
+
+class GroupBroadcastTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        self.student = User.objects.create(username="student")
+        self.other_student = User.objects.create(username="other")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        for user in [self.student, self.other_student]:
+            Membership.objects.create(course=self.course, user=user, kind=Membership.KIND_STUDENT)
+        self.asked = Question.objects.create(queue=self.queue, asked_by=self.student, text="1")
+        self.rejected = Question.objects.create(
+            queue=self.queue,
+            asked_by=self.other_student,
+            text="2",
+            status=Question.STATUS_REJECTED,
+        )
+        self.pks = [self.asked.id, self.rejected.id]
+        self.view_kwargs = {"course_pk": self.course.id, "queue_pk": self.queue.id}
+        self.staff_group = get_broadcast_group_name("ohq.Question", "queue", self.queue.id, "staff")
+        self.student_group = get_broadcast_group_name(
+            "ohq.Question", "queue", self.queue.id, "user", self.student.id
+        )
+        self.other_group = get_broadcast_group_name(
+            "ohq.Question", "queue", self.queue.id, "user", self.other_student.id
+        )
+
+    def get_consumer(self, user):
+        consumer = realtime_router.as_consumer()(
+            {
+                "type": "websocket",
+                "path": "/api/ws/subscribe/",
+                "headers": [],
+                "query_string": b"",
+                "user": user,
+            }
+        )
+        consumer.channel_layer = AsyncMock()
+        consumer.channel_name = "channel"
+        with patch.object(consumer, "accept"):
+            consumer.connect()
+        return consumer
+
+    def test_get_broadcasts(self):
+        """
+        Questions are serialized once for the staff of the queue and each asker.
+        """
+
+        with self.assertNumQueries(3):
+            broadcasts = QuestionViewSet.get_broadcasts(self.pks, {"queue_pk": self.queue.id})
+        self.assertEqual({self.staff_group, self.student_group, self.other_group}, set(broadcasts))
+        self.assertEqual([self.asked.id], [data["id"] for data in broadcasts[self.staff_group]])
+        self.assertEqual(1, broadcasts[self.staff_group][0]["position"])
+        self.assertEqual(broadcasts[self.staff_group], broadcasts[self.student_group])
+        self.assertEqual([], broadcasts[self.other_group])
+
+    @patch("ohq.realtime.get_channel_layer")
+    def test_fan_out(self, mock_get_channel_layer):
+        mock_group_send = mock_get_channel_layer.return_value.group_send = AsyncMock()
+        broadcast_bulk_update(Question, self.pks, view_kwargs={"queue_pk": self.queue.id})
+        groups = {call[0][0] for call in mock_group_send.call_args_list}
+        student_queue_groups = {
+            get_broadcast_group_name("ohq.StudentQueue", "course", self.course.id, "user", user.id)
+            for user in [self.student, self.other_student]
+        }
+        self.assertEqual(
+            {self.staff_group, self.student_group, self.other_group, *student_queue_groups}, groups
+        )
+        self.assertNotIn(group_name, groups)
+
+    @patch("ohq.realtime.transaction.on_commit", side_effect=lambda func: func())
+    @patch("ohq.realtime.broadcast_bulk_update")
+    def test_save_handler(self, mock_broadcast, mock_on_commit):
+        self.asked.save()
+        mock_broadcast.assert_called_once_with(
+            Question, [self.asked.id], view_kwargs={"queue_pk": self.queue.id}
+        )
+
+    def subscribe(self, consumer, request_id=1, patch=False):
+        consumer.receive_json(
+            {
+                "type": "subscribe",
+                "id": request_id,
+                "model": "ohq.Question",
+                "action": "list",
+                "view_kwargs": self.view_kwargs,
+                "patch": patch,
+            }
+        )
+
+    def broadcast(self, consumer):
+        """
+        Send the current state of the asked question to a TA consumer and return the messages.
+        """
+
+        broadcasts = QuestionViewSet.get_broadcasts([self.asked.id], {"queue_pk": self.queue.id})
+        with patch.object(consumer, "send") as mock_send:
+            consumer.instances_broadcast(
+                {
+                    "type": "instances.broadcast",
+                    "model": "ohq.Question",
+                    "instance_pks": [self.asked.id],
+                    "instances": broadcasts[self.staff_group],
+                    "view_kwargs": {"queue_pk": self.queue.id},
+                }
+            )
+        return [json.loads(call[1]["text_data"]) for call in mock_send.call_args_list]
+
+    def test_subscribe_staff(self):
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer)
+        consumer.channel_layer.group_add.assert_any_call(self.staff_group, "channel")
+        self.assertIn(self.staff_group, consumer.groups)
+
+    def test_subscribe_student(self):
+        consumer = self.get_consumer(self.student)
+        self.subscribe(consumer)
+        consumer.channel_layer.group_add.assert_any_call(self.student_group, "channel")
+        self.assertNotIn(self.staff_group, consumer.groups)
+
+    def test_subscribe_identical(self):
+        consumer = self.get_consumer(self.student)
+        self.subscribe(consumer)
+        with self.assertNumQueries(0):
+            self.subscribe(consumer, request_id=2)
+        subscriptions = consumer.subscriptions[group_name]
+        self.assertEqual([1, 2], [subscription.request_id for subscription in subscriptions])
+        self.assertEqual(subscriptions[0].pks_in_queryset, subscriptions[1].pks_in_queryset)
+        self.assertIsNot(subscriptions[0].pks_in_queryset, subscriptions[1].pks_in_queryset)
+        self.assertEqual(
+            1,
+            consumer.channel_layer.group_add.call_args_list.count(
+                ((self.student_group, "channel"),)
+            ),
+        )
+
+        # The broadcast group is kept until the last of the subscriptions is gone
+        consumer.receive_json({"type": "unsubscribe", "id": 1})
+        self.assertIn(self.student_group, consumer.groups)
+        consumer.receive_json({"type": "unsubscribe", "id": 2})
+        self.assertNotIn(self.student_group, consumer.groups)
+
+    def test_unsubscribe(self):
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer)
+        consumer.receive_json({"type": "unsubscribe", "id": 1})
+        consumer.channel_layer.group_discard.assert_any_call(self.staff_group, "channel")
+        self.assertNotIn(self.staff_group, consumer.groups)
+
+    def test_instances_broadcast(self):
+        """
+        Subscriptions receive the serialized instances without any queries.
+        """
+
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer)
+        consumer.subscriptions[group_name][0].pks_in_queryset = {self.rejected.id}
+        broadcasts = QuestionViewSet.get_broadcasts(self.pks, {"queue_pk": self.queue.id})
+        with self.assertNumQueries(0), patch.object(consumer, "send_broadcast") as mock_send:
+            consumer.instances_broadcast(
+                {
+                    "type": "instances.broadcast",
+                    "model": "ohq.Question",
+                    "instance_pks": self.pks,
+                    "instances": broadcasts[self.staff_group],
+                    "view_kwargs": {"queue_pk": self.queue.id},
+                }
+            )
+        sent = {call[0][2]: call[0][3] for call in mock_send.call_args_list}
+        self.assertEqual(self.asked.id, sent[CREATED]["id"])
+        self.assertEqual({"pk": self.rejected.id, "id": self.rejected.id}, sent[DELETED])
+        self.assertEqual({self.asked.id}, consumer.subscriptions[group_name][0].pks_in_queryset)
+
+    def test_patch(self):
+        """
+        Patch mode subscriptions only receive the fields that changed since the last broadcast.
+        """
+
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer, patch=True)
+        first = self.broadcast(consumer)
+        self.assertEqual(1, len(first))
+        self.assertNotIn("patch", first[0])
+        self.assertEqual("1", first[0]["instance"]["text"])
+
+        Question.objects.filter(pk=self.asked.id).update(note="Note", version=1)
+        second = self.broadcast(consumer)
+        self.assertEqual(1, len(second))
+        self.assertTrue(second[0]["patch"])
+        self.assertEqual(0, second[0]["baseVersion"])
+        self.assertEqual({"id": self.asked.id, "note": "Note", "version": 1}, second[0]["instance"])
+
+        self.assertEqual([], self.broadcast(consumer))
+
+    def test_no_patch(self):
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer)
+        self.broadcast(consumer)
+        Question.objects.filter(pk=self.asked.id).update(note="Note")
+        messages = self.broadcast(consumer)
+        self.assertNotIn("patch", messages[0])
+        self.assertEqual("1", messages[0]["instance"]["text"])
+
+    def test_resync(self):
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer, patch=True)
+        consumer.subscriptions[group_name][0].pks_in_queryset = {self.rejected.id}
+        with patch.object(consumer, "send") as mock_send:
+            consumer.receive_json({"type": "resync", "id": 1})
+        message = json.loads(mock_send.call_args[1]["text_data"])
+        self.assertEqual("resync", message["type"])
+        self.assertEqual([self.asked.id], [data["id"] for data in message["instances"]])
+        self.assertEqual({self.asked.id}, consumer.subscriptions[group_name][0].pks_in_queryset)
+
+        # The resynced instances are the base of the next patch
+        Question.objects.filter(pk=self.asked.id).update(note="Note")
+        self.assertTrue(self.broadcast(consumer)[0]["patch"])
+
+    def test_resync_not_subscribed(self):
+        consumer = self.get_consumer(self.ta)
+        with patch.object(consumer, "send_error") as mock_send_error:
+            consumer.receive_json({"type": "resync", "id": 1})
+        mock_send_error.assert_called_once()
+        self.assertEqual(404, mock_send_error.call_args[0][1])
+
+    def test_membership_cached(self):
+        """
+        Memberships are only read once per connection.
+        """
+
+        consumer = self.get_consumer(self.ta)
+        self.subscribe(consumer)
+        self.assertIn(str(self.course.id), consumer.scope["memberships"])
+        with CaptureQueriesContext(connection) as queries:
+            consumer.receive_json(
+                {
+                    "type": "subscribe",
+                    "id": 2,
+                    "model": "ohq.Question",
+                    "action": "list",
+                    "view_kwargs": self.view_kwargs,
+                    "query_params": {"other": "1"},
+                }
+            )
+        self.assertEqual(2, len(consumer.subscriptions[group_name]))
+        self.assertFalse(any("ohq_membership" in query["sql"] for query in queries))
+
+    def test_membership_group(self):
+        consumer = self.get_consumer(self.ta)
+        group = get_membership_group_name(self.ta.id)
+        consumer.channel_layer.group_add.assert_any_call(group, "channel")
+        self.assertIn(group, consumer.groups)
+
+        # Broadcast groups are left without leaving the membership group
+        self.subscribe(consumer)
+        consumer.receive_json({"type": "unsubscribe", "id": 1})
+        self.assertIn(group, consumer.groups)
+
+    @patch("ohq.realtime.transaction.on_commit", side_effect=lambda func: func())
+    @patch("ohq.realtime.get_channel_layer")
+    def test_membership_signal(self, mock_get_channel_layer, mock_on_commit):
+        mock_group_send = mock_get_channel_layer.return_value.group_send = AsyncMock()
+        membership = Membership.objects.get(user=self.student)
+        membership.kind = Membership.KIND_TA
+        membership.save()
+        mock_group_send.assert_called_once_with(
+            get_membership_group_name(self.student.id),
+            {"type": "membership.changed", "course_id": self.course.id},
+        )
+
+    @patch("ohq.realtime.transaction.on_commit", side_effect=lambda func: func())
+    @patch("ohq.realtime.get_channel_layer")
+    def test_list_last_active(self, mock_get_channel_layer, mock_on_commit):
+        """
+        Polling the question list updates the last active time without a membership.changed event.
+        """
+
+        mock_group_send = mock_get_channel_layer.return_value.group_send = AsyncMock()
+        self.client.force_login(self.ta)
+        response = self.client.get(
+            reverse("ohq:question-list", args=[self.course.id, self.queue.id])
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertIsNotNone(Membership.objects.get(user=self.ta).last_active)
+        mock_group_send.assert_not_called()
+
+    def test_membership_changed(self):
+        """
+        Subscriptions move to the broadcast groups of the new role.
+        """
+
+        consumer = self.get_consumer(self.student)
+        self.subscribe(consumer)
+        Membership.objects.filter(user=self.student).update(kind=Membership.KIND_TA)
+        consumer.membership_changed({"type": "membership.changed", "course_id": self.course.id})
+        self.assertIn(self.staff_group, consumer.groups)
+        self.assertNotIn(self.student_group, consumer.groups)
+        consumer.channel_layer.group_discard.assert_any_call(self.student_group, "channel")
+
+    def test_membership_removed(self):
+        consumer = self.get_consumer(self.student)
+        self.subscribe(consumer)
+        Membership.objects.filter(user=self.student).delete()
+        with patch.object(consumer, "send_error") as mock_send_error:
+            consumer.membership_changed({"type": "membership.changed", "course_id": self.course.id})
+        self.assertEqual((1, 403), mock_send_error.call_args[0][:2])
+        self.assertEqual([], consumer.subscriptions[group_name])
+        self.assertNotIn(self.student_group, consumer.groups)
+        self.assertNotIn(group_name, consumer.groups)
+
+
+class AnnouncementRealtimeTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.student = User.objects.create(username="student")
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        self.announcement = Announcement.objects.create(
+            content="Announcement", author=self.student, course=self.course
+        )
+
+    def test_student_list_permission(self):
+        """
+        Views built for subscriptions keep their action, which announcement permissions depend on.
+        """
+
+        scope = {
+            "type": "websocket",
+            "path": "/api/ws/subscribe/",
+            "headers": [],
+            "query_string": b"",
+            "user": self.student,
+            "memberships": {},
+        }
+        view = AnnouncementViewSet.from_scope("list", scope, {"course_pk": self.course.id}, {})
+        self.assertEqual("list", view.action)
+        for permission in view.get_permissions():
+            self.assertTrue(permission.has_permission(view.request, view))
+
+    @patch("ohq.realtime.transaction.on_commit", side_effect=lambda func: func())
+    @patch("ohq.realtime.broadcast_bulk_update")
+    def test_save_broadcast(self, mock_broadcast, mock_on_commit):
+        """
+        Saves are broadcast as bulk update events for the course once the transaction commits.
+        """
+
+        self.announcement.save()
+        mock_broadcast.assert_called_once_with(
+            Announcement, [self.announcement.pk], view_kwargs={"course_pk": self.course.id}
+        )
+
+    @patch("rest_live.signals.get_channel_layer")
+    @patch("ohq.realtime.broadcast_bulk_update")
+    def test_save_before_commit(self, mock_broadcast, mock_get_channel_layer):
+        """
+        Nothing is broadcast while the transaction is still open, including by rest_live's own
+        save handler.
+        """
+
+        self.announcement.save()
+        mock_broadcast.assert_not_called()
+        mock_get_channel_layer.assert_not_called()
+
+    @patch("ohq.realtime.transaction.on_commit", side_effect=lambda func: func())
+    @patch("ohq.realtime.broadcast_bulk_update")
+    def test_delete_broadcast(self, mock_broadcast, mock_on_commit):
+        pk = self.announcement.pk
+        self.announcement.delete()
+        mock_broadcast.assert_called_once_with(
+            Announcement, [pk], view_kwargs={"course_pk": self.course.id}
+        )
+
+    def test_delete_event(self):
+        announcement_group_name = get_group_name("ohq.Announcement")
+        consumer = realtime_router.as_consumer()(
+            {
+                "type": "websocket",
+                "path": "/api/ws/subscribe/",
+                "headers": [],
+                "query_string": b"",
+                "user": self.student,
+            }
+        )
+        consumer.subscriptions = {
+            announcement_group_name: [
+                Subscription(
+                    request_id=1,
+                    action="list",
+                    view_kwargs={"course_pk": self.course.id},
+                    query_params={},
+                    pks_in_queryset={self.announcement.pk},
+                )
+            ]
+        }
+        pk = self.announcement.pk
+        self.announcement.delete()
+        with patch.object(consumer, "send_broadcast") as mock_send:
+            consumer.models_saved(
+                {
+                    "type": "models.saved",
+                    "model": "ohq.Announcement",
+                    "instance_pks": [pk],
+                    "view_kwargs": {"course_pk": self.course.id},
+                    "channel_name": announcement_group_name,
+                }
+            )
+        mock_send.assert_called_once()
+        self.assertEqual(DELETED, mock_send.call_args[0][2])
+        self.assertEqual(pk, mock_send.call_args[0][3]["id"])
+
+
+class QueueRealtimeTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.archived = Queue.objects.create(name="Archived", course=self.course, archived=True)
+        self.student = User.objects.create(username="student")
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        Question.objects.create(queue=self.queue, asked_by=self.student, text="Question")
+        self.course_group = get_broadcast_group_name("ohq.Queue", "course", self.course.id)
+
+    def test_get_broadcasts(self):
+        """
+        Queues are annotated and serialized once for the whole course.
+        """
+
+        with self.assertNumQueries(1):
+            broadcasts = QueueViewSet.get_broadcasts(
+                [self.queue.id, self.archived.id], {"course_pk": self.course.id}
+            )
+        self.assertEqual([self.course_group], list(broadcasts))
+        self.assertEqual([self.queue.id], [data["id"] for data in broadcasts[self.course_group]])
+        self.assertEqual(1, broadcasts[self.course_group][0]["questions_asked"])
+
+    @patch("ohq.realtime.get_channel_layer")
+    def test_question_version_bump(self, mock_get_channel_layer):
+        """
+        Question writes reach queue subscribers through the course group only.
+        """
+
+        mock_group_send = mock_get_channel_layer.return_value.group_send = AsyncMock()
+        broadcast_bulk_update(Queue, [self.queue.id], view_kwargs={"course_pk": self.course.id})
+        mock_group_send.assert_called_once()
+        group, event = mock_group_send.call_args[0]
+        self.assertEqual(self.course_group, group)
+        self.assertEqual("instances.broadcast", event["type"])
+        self.assertEqual([self.queue.id], [data["id"] for data in event["instances"]])
+
+    def test_subscribe(self):
+        consumer = realtime_router.as_consumer()(
+            {
+                "type": "websocket",
+                "path": "/api/ws/subscribe/",
+                "headers": [],
+                "query_string": b"",
+                "user": self.student,
+            }
+        )
+        consumer.channel_layer = AsyncMock()
+        consumer.channel_name = "channel"
+        with patch.object(consumer, "accept"):
+            consumer.connect()
+        consumer.receive_json(
+            {
+                "type": "subscribe",
+                "id": 1,
+                "model": "ohq.Queue",
+                "action": "list",
+                "view_kwargs": {"course_pk": self.course.id},
+            }
+        )
+        consumer.channel_layer.group_add.assert_any_call(self.course_group, "channel")
+
+
+class StudentQueueRealtimeTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(
+            name="Queue",
+            course=self.course,
+            rate_limit_enabled=True,
+            rate_limit_length=0,
+            rate_limit_questions=1,
+            rate_limit_minutes=10,
+        )
+        self.student = User.objects.create(username="student")
+        self.ahead = User.objects.create(username="ahead")
+        self.answered = User.objects.create(username="answered")
+        self.bystander = User.objects.create(username="bystander")
+        for user in [self.student, self.ahead, self.answered, self.bystander]:
+            Membership.objects.create(course=self.course, user=user, kind=Membership.KIND_STUDENT)
+        Question.objects.create(queue=self.queue, asked_by=self.ahead, text="Ahead")
+        self.question = Question.objects.create(
+            queue=self.queue, asked_by=self.student, text="Question"
+        )
+        self.last = Question.objects.create(
+            queue=self.queue,
+            asked_by=self.answered,
+            text="Answered",
+            status=Question.STATUS_ANSWERED,
+            time_responded_to=timezone.now(),
+        )
+
+    def get_group(self, user):
+        return get_broadcast_group_name(
+            "ohq.StudentQueue", "course", self.course.id, "user", user.id
+        )
+
+    def test_get_broadcasts(self):
+        """
+        Students with open questions or questions counting towards their quota receive their
+        view of the queue, while everyone else is left alone.
+        """
+
+        broadcasts = StudentQueueViewSet.get_broadcasts(
+            [self.queue.id], {"course_pk": self.course.id}
+        )
+        self.assertEqual(
+            {self.get_group(user) for user in [self.student, self.ahead, self.answered]},
+            set(broadcasts),
+        )
+
+        [data] = broadcasts[self.get_group(self.student)]
+        self.assertEqual(self.queue.id, data["id"])
+        self.assertEqual(self.question.id, data["question"]["id"])
+        self.assertEqual(2, data["question"]["position"])
+        self.assertIsNone(data["last_question"])
+        self.assertEqual({"count": 0, "wait_time_mins": 0}, data["quota"])
+
+        [data] = broadcasts[self.get_group(self.answered)]
+        self.assertIsNone(data["question"])
+        self.assertEqual(self.last.id, data["last_question"]["id"])
+        self.assertEqual(1, data["quota"]["count"])
+        self.assertGreater(data["quota"]["wait_time_mins"], 0)
+
+    def test_get_broadcasts_users(self):
+        """
+        Users passed explicitly receive their view of the queue as well.
+        """
+
+        broadcasts = StudentQueueViewSet.get_broadcasts(
+            [self.queue.id], {"course_pk": self.course.id}, user_ids=[self.bystander.id]
+        )
+        [data] = broadcasts[self.get_group(self.bystander)]
+        self.assertIsNone(data["question"])
+        self.assertIsNone(data["last_question"])
+
+    def test_get_broadcasts_queries(self):
+        """
+        The number of queries doesn't depend on the number of affected students.
+        """
+
+        with CaptureQueriesContext(connection) as context:
+            StudentQueueViewSet.get_broadcasts([self.queue.id], {"course_pk": self.course.id})
+        for i in range(5):
+            user = User.objects.create(username=f"student{i}")
+            Question.objects.create(queue=self.queue, asked_by=user, text=str(i))
+        with self.assertNumQueries(len(context)):
+            broadcasts = StudentQueueViewSet.get_broadcasts(
+                [self.queue.id], {"course_pk": self.course.id}
+            )
+        self.assertEqual(8, len(broadcasts))
+
+    @patch("ohq.realtime.get_channel_layer")
+    def test_question_broadcast(self, mock_get_channel_layer):
+        """
+        Question changes reach the student queue pages of the course.
+        """
+
+        mock_group_send = mock_get_channel_layer.return_value.group_send = AsyncMock()
+        self.question.status = Question.STATUS_WITHDRAWN
+        self.question.save()
+        broadcast_bulk_update(Question, [self.question.id], view_kwargs={"queue_pk": self.queue.id})
+
+        events = {
+            group: event
+            for group, event in [call[0] for call in mock_group_send.call_args_list]
+            if event["model"] == "ohq.StudentQueue"
+        }
+        self.assertEqual(
+            {self.get_group(user) for user in [self.student, self.ahead, self.answered]},
+            set(events),
+        )
+        event = events[self.get_group(self.student)]
+        self.assertEqual([self.queue.id], event["instance_pks"])
+        self.assertEqual({"course_pk": self.course.id}, event["view_kwargs"])
+        [data] = event["instances"]
+        self.assertIsNone(data["question"])
+        self.assertEqual(self.question.id, data["last_question"]["id"])
+        self.assertEqual(
+            1, events[self.get_group(self.ahead)]["instances"][0]["question"]["position"]
+        )
+
+    def test_subscribe(self):
+        consumer = realtime_router.as_consumer()(
+            {
+                "type": "websocket",
+                "path": "/api/ws/subscribe/",
+                "headers": [],
+                "query_string": b"",
+                "user": self.student,
+            }
+        )
+        consumer.channel_layer = AsyncMock()
+        consumer.channel_name = "channel"
+        with patch.object(consumer, "accept"):
+            consumer.connect()
+        consumer.receive_json(
+            {
+                "type": "subscribe",
+                "id": 1,
+                "model": "ohq.StudentQueue",
+                "action": "list",
+                "view_kwargs": {"course_pk": self.course.id},
+            }
+        )
+        consumer.channel_layer.group_add.assert_any_call(self.get_group(self.student), "channel")
+
+        with patch.object(consumer, "send") as mock_send:
+            consumer.resync(1)
+        message = json.loads(mock_send.call_args[1]["text_data"])
+        [data] = message["instances"]
+        self.assertEqual(self.question.id, data["question"]["id"])
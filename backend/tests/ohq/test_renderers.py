@@ -0,0 +1,118 @@
+import datetime
+import decimal
+import uuid
+from collections import OrderedDict
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from djangorestframework_camel_case import render
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from ohq.models import Course, Membership, Semester
+from ohq.renderers import CamelCaseJSONRenderer, camel_keys
+from ohq.serializers import MembershipSerializer
+
+
+User = get_user_model()
+
+
+class CamelCaseJSONRendererTestCase(TestCase):
+    def setUp(self):
+        self.renderer = CamelCaseJSONRenderer()
+        self.base_renderer = render.CamelCaseJSONRenderer()
+
+    def assertParity(self, data, *args, fast=True):
+        expected = self.base_renderer.render(data, *args)
+        if fast:
+            # The original renderer must not be used as a fallback
+            with patch.object(render.CamelCaseJSONRenderer, "render", side_effect=AssertionError):
+                content = self.renderer.render(data, *args)
+        else:
+            content = self.renderer.render(data, *args)
+        self.assertEqual(expected, content)
+
+    def test_nested(self):
+        self.assertParity(
+            {
+                "snake_case_key": [{"nested_key": 1, "other_key_2": None}],
+                "camelCase": {"a_1": True, "_leading": False, "trailing_": "value_with_underscore"},
+                "list_of_lists": [[1, 2], [], [{"deep_key": 1.5}]],
+            }
+        )
+
+    def test_serializer_containers(self):
+        self.assertParity(
+            ReturnList(
+                [ReturnDict({"first_name": "A"}, serializer=None), OrderedDict(last_name="B")],
+                serializer=None,
+            )
+        )
+
+    def test_values(self):
+        self.assertParity(
+            {
+                "date_time": datetime.datetime(2020, 1, 2, 3, 4, 5, 678901, datetime.timezone.utc),
+                "date": datetime.date(2020, 1, 2),
+                "time": datetime.time(3, 4, 5),
+                "time_delta": datetime.timedelta(minutes=5),
+                "decimal_value": decimal.Decimal("1.50"),
+                "uuid_value": uuid.UUID("12345678123456781234567812345678"),
+                "lazy_string": gettext_lazy("Lazy"),
+                "tuple_value": (1, "two", {"three_four": 5}),
+                "set_value": {1},
+                1: "int key",
+            }
+        )
+
+    def test_big_int(self):
+        self.assertParity({"big_int": 2 ** 70}, fast=False)
+
+    def test_strings(self):
+        self.assertParity({"text": 'quote " backslash \\ slash / control \x00\x1f\x7f\b\f\n\r\t'},)
+        self.assertParity({"text": "unicode é \U0001F600 separators   "})
+
+    def test_floats(self):
+        for value in [0.0, -0.0, 0.5, 1 / 3, 100.0, 1e-4, 1e15]:
+            self.assertParity({"value": value})
+        for value in [1e-5, 2.5e-7, 1e16, -1e20]:
+            self.assertParity({"value": value}, fast=False)
+
+    def test_nan(self):
+        with self.assertRaises(ValueError):
+            self.base_renderer.render({"value": float("nan")})
+        with self.assertRaises(ValueError):
+            self.renderer.render({"value": float("nan")})
+
+    def test_none(self):
+        self.assertParity(None, fast=False)
+
+    def test_indent(self):
+        self.assertParity({"snake_key": [1, 2]}, "application/json; indent=4", fast=False)
+        self.assertParity({"snake_key": [1, 2]}, None, {"indent": 2}, fast=False)
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            self.renderer.render({"value": object()})
+
+    def test_serializer(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        for i in range(3):
+            user = User.objects.create(username=f"user{i}", first_name="First", last_name="Lást")
+            Membership.objects.create(course=course, user=user, kind=Membership.KIND_STUDENT)
+        self.assertParity(MembershipSerializer(Membership.objects.all(), many=True).data)
+
+    def test_keys_cached(self):
+        self.renderer.render({"cached_key": 1})
+        self.assertEqual("cachedKey", camel_keys["cached_key"])
+        with patch("ohq.renderers.re.sub") as mock_sub:
+            self.assertEqual(b'{"cachedKey":1}', self.renderer.render({"cached_key": 1}))
+        mock_sub.assert_not_called()
+
+    @patch("ohq.renderers.orjson", None)
+    def test_without_orjson(self):
+        self.assertParity({"snake_key": [1, 2]}, fast=False)
@@ -0,0 +1,128 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ohq.db.routers import ReplicaRouter, use_replica
+from ohq.models import Course, Membership, Question, Queue, QueueStatistic, Semester
+
+
+User = get_user_model()
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_no_replica(self):
+        with use_replica():
+            self.assertIsNone(self.router.db_for_read(Question))
+
+    @patch.dict(connections.databases, {"replica": {}})
+    def test_db_for_read(self):
+        self.assertIsNone(self.router.db_for_read(Question))
+        with use_replica():
+            self.assertEqual("replica", self.router.db_for_read(Question))
+        self.assertIsNone(self.router.db_for_read(Question))
+
+    @patch.dict(connections.databases, {"replica": {}})
+    def test_decorator(self):
+        @use_replica()
+        def read():
+            return self.router.db_for_read(Question)
+
+        self.assertEqual("replica", read())
+        self.assertEqual("replica", read())
+        self.assertIsNone(self.router.db_for_read(Question))
+
+    def test_allow_relation(self):
+        queue = Queue()
+        queue._state.db = "replica"
+        statistic = QueueStatistic()
+        statistic._state.db = "default"
+        self.assertTrue(self.router.allow_relation(queue, statistic))
+        statistic._state.db = "other"
+        self.assertIsNone(self.router.allow_relation(queue, statistic))
+
+    def test_allow_migrate(self):
+        self.assertFalse(self.router.allow_migrate("replica", "ohq"))
+        self.assertIsNone(self.router.allow_migrate("default", "ohq"))
+
+
+class ReplicaReadsTestCase(TransactionTestCase):
+    """
+    A second connection to the test database stands in for the replica. Data has to be committed
+    for it to be visible there, so these tests don't run in a transaction.
+    """
+
+    def setUp(self):
+        patcher = patch.dict(connections.databases, {"replica": {**connection.settings_dict}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(connections.__delitem__, "replica")
+        self.addCleanup(lambda: connections["replica"].close())
+
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Question.objects.create(
+            queue=self.queue,
+            asked_by=self.ta,
+            text="Question",
+            status=Question.STATUS_ANSWERED,
+            responded_to_by=self.ta,
+            time_asked=timezone.now() - timezone.timedelta(days=1),
+            time_response_started=timezone.now() - timezone.timedelta(days=1),
+            time_responded_to=timezone.now() - timezone.timedelta(days=1),
+        )
+        self.client.force_login(self.ta)
+
+    def get(self, url):
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        return response, replica_queries
+
+    def test_search(self):
+        response, replica_queries = self.get(reverse("ohq:questionsearch", args=[self.course.id]))
+        self.assertEqual(1, response.json()["count"])
+        self.assertTrue(replica_queries)
+        # Memberships are checked on the primary
+        self.assertFalse(any("ohq_membership" in query["sql"] for query in replica_queries))
+
+    def test_statistics(self):
+        QueueStatistic.objects.create(
+            queue=self.queue,
+            metric=QueueStatistic.METRIC_AVG_WAIT,
+            value=1,
+            date=timezone.now().date(),
+        )
+        response, replica_queries = self.get(
+            reverse("ohq:queue-statistic", args=[self.course.id, self.queue.id])
+        )
+        self.assertEqual(1, len(response.json()))
+        self.assertTrue(replica_queries)
+
+    def test_live_endpoints(self):
+        response, replica_queries = self.get(
+            reverse("ohq:question-list", args=[self.course.id, self.queue.id])
+        )
+        self.assertFalse(replica_queries)
+
+    def test_statistics_commands(self):
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            call_command("queue_daily_stat", stdout=StringIO())
+            call_command("queue_heatmap_stat", stdout=StringIO())
+        self.assertTrue(replica_queries)
+        self.assertFalse(any("INSERT" in query["sql"] for query in replica_queries))
+        self.assertTrue(QueueStatistic.objects.filter(queue=self.queue).exists())
@@ -2,18 +2,24 @@ from datetime import datetime
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
 from rest_framework import serializers
 from rest_framework.test import APIClient
 
 from ohq.models import Announcement, Course, Membership, Question, Queue, Semester, Tag
+from ohq.questions import annotate_positions, annotate_positions_window
 from ohq.serializers import (
     CourseCreateSerializer,
     MembershipSerializer,
+    QuestionSerializer,
     SemesterSerializer,
     UserPrivateSerializer,
+    serialize_questions,
 )
 
 
@@ -233,6 +239,39 @@ class QuestionSerializerTestCase(TestCase):
         self.assertEqual(url, self.question.video_chat_url)
         mock_delay.assert_not_called()
 
+    def test_create_tags(self, mock_delay):
+        """
+        Ensure tags are attached to a new question without per-tag queries.
+        """
+
+        Tag.objects.create(course=self.course, name="Other")
+        Tag.objects.create(course=self.course, name="Unused")
+        self.client.force_authenticate(user=self.student2)
+        self.client.post(
+            reverse("ohq:question-list", args=[self.course.id, self.queue.id]),
+            {"text": "Help me", "tags": [{"name": "Tag"}, {"name": "Other"}, {"name": "New"}]},
+        )
+        question = Question.objects.get(asked_by=self.student2)
+        self.assertEqual({"Tag", "Other"}, set(question.tags.values_list("name", flat=True)))
+        mock_delay.assert_not_called()
+
+    def test_student_update_tags(self, mock_delay):
+        """
+        Ensure only the difference between the old and new tags is written.
+        """
+
+        tag = Tag.objects.get(course=self.course, name="Tag")
+        other = Tag.objects.create(course=self.course, name="Other")
+        removed = Tag.objects.create(course=self.course, name="Removed")
+        self.question.tags.add(tag, removed)
+        self.client.force_authenticate(user=self.student)
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, self.question.id]),
+            {"tags": [{"name": "Tag"}, {"name": "Other"}]},
+        )
+        self.assertEqual({tag, other}, set(self.question.tags.all()))
+        mock_delay.assert_not_called()
+
     def test_student_update_note(self, mock_delay):
         """
         Ensure a note is removed when a student modifies their question.
@@ -392,6 +431,144 @@ class QuestionSerializerTestCase(TestCase):
         self.assertEqual(Question.STATUS_ASKED, self.question.status)
         mock_delay.assert_not_called()
 
+    def test_update_version(self, mock_delay):
+        """
+        Ensure the version of a question is incremented when it is modified.
+        """
+
+        self.client.force_authenticate(user=self.student)
+        response = self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, self.question.id]),
+            {"text": "New text", "version": 0},
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, response.data["version"])
+        self.question.refresh_from_db()
+        self.assertEqual("New text", self.question.text)
+        self.assertEqual(1, self.question.version)
+
+    def test_update_conflict(self, mock_delay):
+        """
+        Ensure a question that was modified since the client last saw it isn't overwritten.
+        """
+
+        self.client.force_authenticate(user=self.ta)
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, self.question.id]),
+            {"status": Question.STATUS_ACTIVE, "version": 0},
+        )
+        self.client.force_authenticate(user=self.student)
+        response = self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, self.question.id]),
+            {"text": "New text", "version": 0},
+        )
+        self.assertEqual(409, response.status_code)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question_text, self.question.text)
+        self.assertEqual(Question.STATUS_ACTIVE, self.question.status)
+        self.assertEqual(1, self.question.version)
+
+    def test_update_changed_fields(self, mock_delay):
+        """
+        Ensure only the fields that changed are written.
+        """
+
+        self.client.force_authenticate(user=self.student)
+        with CaptureQueriesContext(connection) as context:
+            self.client.patch(
+                reverse(
+                    "ohq:question-detail", args=[self.course.id, self.queue.id, self.question.id]
+                ),
+                {"text": "New text"},
+            )
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "ohq_question"')
+        ]
+        self.assertEqual(1, len(updates))
+        self.assertIn('"text"', updates[0])
+        self.assertNotIn('"status"', updates[0])
+
+    def test_update_unchanged(self, mock_delay):
+        """
+        Ensure nothing is written if nothing changed.
+        """
+
+        self.client.force_authenticate(user=self.student)
+        for _ in range(2):
+            self.client.patch(
+                reverse(
+                    "ohq:question-detail", args=[self.course.id, self.queue.id, self.question.id]
+                ),
+                {"text": "New text"},
+            )
+        self.question.refresh_from_db()
+        self.assertEqual(1, self.question.version)
+
+
+class SerializeQuestionsTestCase(TestCase):
+    def setUp(self):
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta", first_name="T", email="ta@example.com")
+        self.students = [User.objects.create(username=f"student{i}") for i in range(3)]
+        tags = [Tag.objects.create(name=name, course=self.course) for name in ["a", "b"]]
+        self.asked = Question.objects.create(
+            queue=self.queue, asked_by=self.students[0], text="Asked", note="Note"
+        )
+        self.asked.tags.set(tags)
+        Question.objects.create(
+            queue=self.queue,
+            asked_by=self.students[1],
+            text="Active",
+            status=Question.STATUS_ACTIVE,
+            responded_to_by=self.ta,
+            time_response_started=timezone.now(),
+            video_chat_url="https://example.com",
+        )
+        answered = Question.objects.create(
+            queue=self.queue,
+            asked_by=self.students[2],
+            text="Answered",
+            status=Question.STATUS_ANSWERED,
+            responded_to_by=self.ta,
+            time_responded_to=timezone.now(),
+            rejected_reason="OTHER",
+        )
+        answered.tags.set(tags[1:])
+
+    def assertParity(self, questions):
+        expected = QuestionSerializer(questions, many=True).data
+        data = serialize_questions(questions)
+        self.assertEqual(expected, data)
+        renderer = CamelCaseJSONRenderer()
+        self.assertEqual(renderer.render(expected), renderer.render(data))
+
+    def test_parity(self):
+        self.assertParity(Question.objects.order_by("time_asked"))
+
+    def test_parity_positions(self):
+        self.assertParity(annotate_positions(Question.objects.order_by("time_asked")))
+
+    def test_parity_positions_window(self):
+        self.assertParity(annotate_positions_window(Question.objects.order_by("time_asked")))
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual([], serialize_questions(Question.objects.none()))
+
+    def test_num_queries(self):
+        """
+        Serializing any number of questions takes two queries.
+        """
+
+        with self.assertNumQueries(2):
+            serialize_questions(annotate_positions(Question.objects.all()))
+
 
 class AnnouncementSerializerTestCase(TestCase):
     def setUp(self):
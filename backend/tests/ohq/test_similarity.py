@@ -0,0 +1,136 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ohq.models import Course, Membership, Question, Queue, Semester
+from ohq.similarity import get_bands, group_similar_questions, index_key
+
+
+User = get_user_model()
+
+
+class SimilarityTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=course)
+
+    def create_questions(self, texts):
+        # Questions are created without the serializer, so they aren't indexed yet
+        return [
+            Question.objects.create(
+                queue=self.queue, asked_by=User.objects.create(username=f"student{i}"), text=text
+            ).id
+            for i, text in enumerate(texts)
+        ]
+
+    def test_bands_identical(self):
+        self.assertEqual(
+            get_bands("Segfault in the linked list homework"),
+            get_bands("segfault in the LINKED list homework!"),
+        )
+
+    def test_bands_empty(self):
+        self.assertEqual([], get_bands("a b ?"))
+
+    def test_group(self):
+        ids = self.create_questions(
+            [
+                "How do I fix the segfault in my linked list homework",
+                "Question about the proof in problem 3 of the written assignment",
+                "How do I fix the segfault in the linked list homework",
+                "Can I get an extension",
+            ]
+        )
+        self.assertEqual([[ids[0], ids[2]]], group_similar_questions(self.queue.id, ids))
+
+    def test_group_indexes_missing(self):
+        ids = self.create_questions(["Segfault in linked list"])
+        with self.assertNumQueries(1):
+            group_similar_questions(self.queue.id, ids)
+        self.assertEqual(
+            get_bands("Segfault in linked list"), cache.get(index_key(self.queue.id, ids[0]))
+        )
+
+    def test_group_uses_index(self):
+        """
+        The text of indexed questions isn't loaded.
+        """
+
+        ids = self.create_questions(["Other", "Segfault in linked list"])
+        cache.set(index_key(self.queue.id, ids[0]), get_bands("Segfault in linked list"))
+        cache.set(index_key(self.queue.id, ids[1]), get_bands("Segfault in linked list"))
+        with self.assertNumQueries(0):
+            self.assertEqual([ids], group_similar_questions(self.queue.id, ids))
+
+
+@patch("ohq.serializers.sendUpNextNotificationTask.delay")
+class SimilarQuestionsViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        semester = Semester.objects.create(year=2020, term=Semester.TERM_SUMMER)
+        self.course = Course.objects.create(
+            course_code="000", department="TEST", course_title="Title", semester=semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        self.student = User.objects.create(username="student")
+        self.other_student = User.objects.create(username="other_student")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        Membership.objects.create(
+            course=self.course, user=self.other_student, kind=Membership.KIND_STUDENT
+        )
+        self.questions_url = reverse("ohq:question-list", args=[self.course.id, self.queue.id])
+        self.similar_url = reverse("ohq:question-similar", args=[self.course.id, self.queue.id])
+
+    def ask(self, user, text):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.questions_url, {"text": text, "tags": []})
+        return json.loads(response.content)["id"]
+
+    def test_create_indexes(self, mock_delay):
+        question_id = self.ask(self.student, "Segfault in linked list")
+        self.assertEqual(
+            get_bands("Segfault in linked list"), cache.get(index_key(self.queue.id, question_id))
+        )
+
+    def test_update_indexes(self, mock_delay):
+        question_id = self.ask(self.student, "Segfault in linked list")
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"text": "Proof for problem 3"},
+        )
+        self.assertEqual(
+            get_bands("Proof for problem 3"), cache.get(index_key(self.queue.id, question_id))
+        )
+
+    def test_similar(self, mock_delay):
+        first = self.ask(self.student, "How do I fix the segfault in my linked list homework")
+        second = self.ask(
+            self.other_student, "How do I fix the segfault in the linked list homework"
+        )
+        self.client.force_authenticate(user=self.ta)
+        response = self.client.get(self.similar_url)
+        self.assertEqual([[first, second]], json.loads(response.content))
+
+    def test_similar_only_asked(self, mock_delay):
+        self.ask(self.student, "How do I fix the segfault in my linked list homework")
+        second = self.ask(
+            self.other_student, "How do I fix the segfault in the linked list homework"
+        )
+        Question.objects.filter(id=second).update(status=Question.STATUS_ACTIVE)
+        self.client.force_authenticate(user=self.ta)
+        response = self.client.get(self.similar_url)
+        self.assertEqual([], json.loads(response.content))
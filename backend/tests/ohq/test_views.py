@@ -1,15 +1,30 @@
 import json
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from djangorestframework_camel_case.util import camelize
 from rest_framework.test import APIClient
 
-from ohq.models import Course, Membership, MembershipInvite, Question, Queue, Semester
-from ohq.serializers import UserPrivateSerializer
+from ohq.models import (
+    Announcement,
+    Course,
+    Membership,
+    MembershipInvite,
+    Question,
+    QuestionEvent,
+    Queue,
+    Semester,
+    Tag,
+)
+from ohq.questions import annotate_positions
+from ohq.serializers import QuestionSerializer, UserPrivateSerializer
 
 
 User = get_user_model()
@@ -174,10 +189,16 @@ class QuestionViewTestCase(TestCase):
         )
 
         self.prelimit_question = Question.objects.create(
-            queue=self.queue2, asked_by=self.student3, text="Help me"
+            queue=self.queue2,
+            asked_by=self.student3,
+            text="Help me",
+            status=Question.STATUS_ANSWERED,
         )
         self.prelimit_question1 = Question.objects.create(
-            queue=self.queue2, asked_by=self.student3, text="Help me"
+            queue=self.queue2,
+            asked_by=self.student3,
+            text="Help me",
+            status=Question.STATUS_ANSWERED,
         )
         self.prelimit_question2 = Question.objects.create(
             queue=self.queue2, asked_by=self.student3, text="Help me"
@@ -232,3 +253,633 @@ class QuestionViewTestCase(TestCase):
             reverse("ohq:question-quota-count", args=[self.course.id, self.queue3.id])
         )
         self.assertEqual(0, json.loads(res.content)["wait_time_mins"])
+
+    def test_open_question(self):
+        Question.objects.create(queue=self.no_limit_queue, asked_by=self.student, text="Help me")
+        self.client.force_authenticate(user=self.student)
+        res = self.client.post(
+            reverse("ohq:question-list", args=[self.course.id, self.no_limit_queue.id]),
+            {"text": "Second question", "tags": []},
+        )
+        self.assertEqual(403, res.status_code)
+        self.assertEqual("you already have an open question", res.json()["detail"])
+
+    @patch("ohq.views.QuestionViewSet.perform_create", side_effect=IntegrityError("other"))
+    def test_other_integrity_error(self, mock_perform_create):
+        """
+        Only violations of the unique_open_question constraint mean the student already has an
+        open question.
+        """
+
+        self.client.force_authenticate(user=self.student)
+        with self.assertRaises(IntegrityError):
+            self.client.post(
+                reverse("ohq:question-list", args=[self.course.id, self.no_limit_queue.id]),
+                {"text": "Question", "tags": []},
+            )
+
+
+@patch("ohq.questions.sendUpNextNotificationTask.delay")
+class QuestionTransitionTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.other_queue = Queue.objects.create(name="Other Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        self.ta2 = User.objects.create(username="ta2")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(course=self.course, user=self.ta2, kind=Membership.KIND_TA)
+        self.questions = []
+        for i in range(3):
+            student = User.objects.create(username=f"student{i}")
+            Membership.objects.create(
+                course=self.course, user=student, kind=Membership.KIND_STUDENT
+            )
+            self.questions.append(
+                Question.objects.create(queue=self.queue, asked_by=student, text="Help me")
+            )
+        self.active_question = self.questions[0]
+        self.active_question.status = Question.STATUS_ACTIVE
+        self.active_question.responded_to_by = self.ta2
+        self.active_question.time_response_started = timezone.now() - timedelta(minutes=5)
+        self.active_question.save()
+        self.other_question = Question.objects.create(
+            queue=self.other_queue, asked_by=student, text="Help me"
+        )
+        self.url = reverse("ohq:question-transition", args=[self.course.id, self.queue.id])
+        self.client.force_authenticate(user=self.ta)
+
+    def test_answer(self, mock_delay):
+        ids = [question.id for question in self.questions] + [self.other_question.id]
+        response = self.client.post(self.url, {"ids": ids, "status": Question.STATUS_ANSWERED})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {question.id for question in self.questions}, set(json.loads(response.content)["ids"])
+        )
+        for question in self.questions:
+            question.refresh_from_db()
+            self.assertEqual(Question.STATUS_ANSWERED, question.status)
+            self.assertIsNotNone(question.time_response_started)
+            self.assertIsNotNone(question.time_responded_to)
+        # The original responder is kept
+        self.assertEqual(self.ta2, self.questions[0].responded_to_by)
+        self.assertEqual(self.ta, self.questions[1].responded_to_by)
+        self.other_question.refresh_from_db()
+        self.assertEqual(Question.STATUS_ASKED, self.other_question.status)
+        mock_delay.assert_called_once_with(self.queue.id)
+
+    def test_reject(self, mock_delay):
+        ids = [question.id for question in self.questions[1:]]
+        response = self.client.post(
+            self.url,
+            {"ids": ids, "status": Question.STATUS_REJECTED, "rejected_reason": "NOT_HERE"},
+        )
+        self.assertEqual(200, response.status_code)
+        for question in self.questions[1:]:
+            question.refresh_from_db()
+            self.assertEqual(Question.STATUS_REJECTED, question.status)
+            self.assertEqual("NOT_HERE", question.rejected_reason)
+            self.assertEqual(self.ta, question.responded_to_by)
+        mock_delay.assert_called_once_with(self.queue.id)
+
+    def test_reject_no_reason(self, mock_delay):
+        response = self.client.post(
+            self.url, {"ids": [self.questions[1].id], "status": Question.STATUS_REJECTED}
+        )
+        self.assertEqual(400, response.status_code)
+        self.questions[1].refresh_from_db()
+        self.assertEqual(Question.STATUS_ASKED, self.questions[1].status)
+        mock_delay.assert_not_called()
+
+    def test_withdraw(self, mock_delay):
+        response = self.client.post(
+            self.url, {"ids": [self.questions[1].id], "status": Question.STATUS_WITHDRAWN}
+        )
+        self.assertEqual(400, response.status_code)
+        mock_delay.assert_not_called()
+
+    def test_undo(self, mock_delay):
+        response = self.client.post(
+            self.url, {"ids": [self.active_question.id], "status": Question.STATUS_ASKED}
+        )
+        self.assertEqual(200, response.status_code)
+        self.active_question.refresh_from_db()
+        self.assertEqual(Question.STATUS_ASKED, self.active_question.status)
+        self.assertIsNone(self.active_question.responded_to_by)
+        self.assertIsNone(self.active_question.time_response_started)
+        mock_delay.assert_not_called()
+
+
+class QuestionNextTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        self.tag = Tag.objects.create(name="Tag", course=self.course)
+        self.questions = []
+        for i in range(3):
+            student = User.objects.create(username=f"student{i}")
+            Membership.objects.create(
+                course=self.course, user=student, kind=Membership.KIND_STUDENT
+            )
+            question = Question.objects.create(queue=self.queue, asked_by=student, text="Help me")
+            question.time_asked = timezone.now() - timedelta(minutes=10 - i)
+            question.save()
+            self.questions.append(question)
+        self.questions[2].tags.add(self.tag)
+        self.url = reverse("ohq:question-next", args=[self.course.id, self.queue.id])
+        self.client.force_authenticate(user=self.ta)
+
+    def test_next(self):
+        response = self.client.post(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.questions[0].id, json.loads(response.content)["id"])
+        self.questions[0].refresh_from_db()
+        self.assertEqual(Question.STATUS_ACTIVE, self.questions[0].status)
+        self.assertEqual(self.ta, self.questions[0].responded_to_by)
+        self.assertIsNotNone(self.questions[0].time_response_started)
+
+        response = self.client.post(self.url)
+        self.assertEqual(self.questions[1].id, json.loads(response.content)["id"])
+
+    def test_next_preferred_tags(self):
+        response = self.client.post(self.url, {"tags": ["Tag"]})
+        self.assertEqual(self.questions[2].id, json.loads(response.content)["id"])
+
+    def test_next_preferred_tags_fallback(self):
+        response = self.client.post(self.url, {"tags": ["Other"]})
+        self.assertEqual(self.questions[0].id, json.loads(response.content)["id"])
+
+    def test_next_skip_locked(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(self.url)
+        self.assertTrue(any("SKIP LOCKED" in query["sql"] for query in context.captured_queries))
+
+    def test_next_empty(self):
+        Question.objects.update(status=Question.STATUS_ACTIVE)
+        response = self.client.post(self.url)
+        self.assertEqual(404, response.status_code)
+
+
+@patch("ohq.serializers.sendUpNextNotificationTask.delay")
+class QuestionEventTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        self.student = User.objects.create(username="student")
+        self.other_student = User.objects.create(username="other_student")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        Membership.objects.create(
+            course=self.course, user=self.other_student, kind=Membership.KIND_STUDENT
+        )
+        self.url = reverse("ohq:event-list", args=[self.course.id, self.queue.id])
+
+    def ask(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(
+            reverse("ohq:question-list", args=[self.course.id, self.queue.id]),
+            {"text": "Help me", "tags": []},
+        )
+        return json.loads(response.content)["id"]
+
+    def test_events(self, mock_delay):
+        question_id = self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"status": Question.STATUS_ACTIVE},
+        )
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"status": Question.STATUS_ANSWERED},
+        )
+        response = self.client.get(self.url)
+        events = json.loads(response.content)["results"]
+        self.assertEqual(
+            [
+                (None, Question.STATUS_ASKED, self.student.id),
+                (Question.STATUS_ASKED, Question.STATUS_ACTIVE, self.ta.id),
+                (Question.STATUS_ACTIVE, Question.STATUS_ANSWERED, self.ta.id),
+            ],
+            [(event["fromStatus"], event["toStatus"], event["actor"]) for event in events],
+        )
+
+        response = self.client.get(self.url, {"since": events[0]["id"]})
+        self.assertEqual(events[1:], json.loads(response.content)["results"])
+
+    @patch("ohq.pagination.QuestionEventPagination.page_size", 2)
+    def test_events_paginated(self, mock_delay):
+        for student in [self.student, self.other_student]:
+            self.ask(student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.post(reverse("ohq:question-next", args=[self.course.id, self.queue.id]))
+
+        page = json.loads(self.client.get(self.url, {"since": 0}).content)
+        events = page["results"]
+        self.assertEqual(2, len(events))
+        page = json.loads(self.client.get(page["next"]).content)
+        events += page["results"]
+        self.assertIsNone(page["next"])
+        self.assertEqual(
+            list(QuestionEvent.objects.filter(queue=self.queue).values_list("id", flat=True)),
+            [event["id"] for event in events],
+        )
+
+    def test_events_note_only(self, mock_delay):
+        question_id = self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"note": "Add more detail"},
+        )
+        self.assertEqual(1, QuestionEvent.objects.filter(question=question_id).count())
+
+    def test_events_next(self, mock_delay):
+        question_id = self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.post(reverse("ohq:question-next", args=[self.course.id, self.queue.id]))
+        event = QuestionEvent.objects.filter(question=question_id).latest("id")
+        self.assertEqual(Question.STATUS_ACTIVE, event.to_status)
+        self.assertEqual(self.ta, event.actor)
+
+    @patch("ohq.questions.sendUpNextNotificationTask.delay")
+    def test_events_clear(self, mock_questions_delay, mock_delay):
+        question_id = self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.post(reverse("ohq:queue-clear", args=[self.course.id, self.queue.id]))
+        event = QuestionEvent.objects.filter(question=question_id).latest("id")
+        self.assertEqual(Question.STATUS_REJECTED, event.to_status)
+        self.assertEqual(self.ta, event.actor)
+
+    def test_events_student(self, mock_delay):
+        question_id = self.ask(self.student)
+        self.ask(self.other_student)
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [question_id], [event["question"] for event in json.loads(response.content)["results"]],
+        )
+
+
+@patch("ohq.serializers.sendUpNextNotificationTask.delay")
+class QuestionDeltaTestCase(TransactionTestCase):
+    """
+    Question versions are transaction ids, so these tests need real transactions.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        self.students = []
+        for i in range(3):
+            student = User.objects.create(username=f"student{i}")
+            Membership.objects.create(
+                course=self.course, user=student, kind=Membership.KIND_STUDENT
+            )
+            self.students.append(student)
+        self.url = reverse("ohq:question-list", args=[self.course.id, self.queue.id])
+
+    def ask(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.url, {"text": "Help me", "tags": []})
+        return json.loads(response.content)["id"]
+
+    def sync(self, since):
+        self.client.force_authenticate(user=self.ta)
+        return json.loads(self.client.get(self.url, {"since": since}).content)
+
+    def test_initial(self, mock_delay):
+        first = self.ask(self.students[0])
+        second = self.ask(self.students[1])
+        delta = self.sync(0)
+        self.assertGreaterEqual(
+            delta["version"], Question.objects.get(id=second).modified_version,
+        )
+        self.assertEqual([first, second], [question["id"] for question in delta["inserted"]])
+        self.assertEqual([], delta["changed"])
+        self.assertEqual([], delta["removed"])
+
+    def test_unchanged(self, mock_delay):
+        self.ask(self.students[0])
+        version = self.sync(0)["version"]
+        delta = self.sync(version)
+        # Other transactions move the version forward as well
+        self.assertGreaterEqual(delta.pop("version"), version)
+        self.assertEqual({"inserted": [], "changed": [], "removed": []}, delta)
+
+    def test_delta(self, mock_delay):
+        changed = self.ask(self.students[0])
+        removed = self.ask(self.students[1])
+        version = self.sync(0)["version"]
+
+        inserted = self.ask(self.students[2])
+        self.client.force_authenticate(user=self.ta)
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, changed]),
+            {"status": Question.STATUS_ACTIVE},
+        )
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, removed]),
+            {"status": Question.STATUS_REJECTED, "rejected_reason": "OTHER"},
+        )
+        delta = self.sync(version)
+        self.assertGreater(delta["version"], version)
+        self.assertEqual([inserted], [question["id"] for question in delta["inserted"]])
+        self.assertEqual([changed], [question["id"] for question in delta["changed"]])
+        self.assertEqual(Question.STATUS_ACTIVE, delta["changed"][0]["status"])
+        self.assertEqual([removed], delta["removed"])
+
+    def test_inserted_and_removed(self, mock_delay):
+        version = self.sync(0)["version"]
+        question_id = self.ask(self.students[0])
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"status": Question.STATUS_WITHDRAWN},
+        )
+        delta = self.sync(version)
+        self.assertEqual([], delta["inserted"])
+        self.assertEqual([question_id], delta["removed"])
+
+    def test_removed_after_resync(self, mock_delay):
+        """
+        Questions that a sync returned while their transaction was in progress are removed
+        by a later sync even though they were created after the version it reported.
+        """
+
+        question_id = self.ask(self.students[0])
+        question = Question.objects.get(id=question_id)
+        version = question.created_version - 1
+        self.assertEqual([question_id], [q["id"] for q in self.sync(version)["inserted"]])
+        self.client.force_authenticate(user=self.students[0])
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"status": Question.STATUS_WITHDRAWN},
+        )
+        self.assertEqual([question_id], self.sync(version)["removed"])
+
+    def test_initial_removed(self, mock_delay):
+        question_id = self.ask(self.students[0])
+        self.client.patch(
+            reverse("ohq:question-detail", args=[self.course.id, self.queue.id, question_id]),
+            {"status": Question.STATUS_WITHDRAWN},
+        )
+        self.assertEqual([], self.sync(0)["removed"])
+
+    @patch("ohq.questions.sendUpNextNotificationTask.delay")
+    def test_clear(self, mock_questions_delay, mock_delay):
+        question_id = self.ask(self.students[0])
+        version = self.sync(0)["version"]
+        self.client.post(reverse("ohq:queue-clear", args=[self.course.id, self.queue.id]))
+        self.assertEqual([question_id], self.sync(version)["removed"])
+
+    def test_invalid(self, mock_delay):
+        self.client.force_authenticate(user=self.ta)
+        self.assertEqual(400, self.client.get(self.url, {"since": "abc"}).status_code)
+
+
+# The shared list is keyed by the question stamp of the queue, which changes on commit
+@patch("ohq.cache.transaction.on_commit", side_effect=lambda func: func())
+@patch("ohq.serializers.sendUpNextNotificationTask.delay")
+class QuestionListCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        self.ta2 = User.objects.create(username="ta2")
+        self.student = User.objects.create(username="student")
+        self.other_student = User.objects.create(username="other_student")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(course=self.course, user=self.ta2, kind=Membership.KIND_TA)
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        Membership.objects.create(
+            course=self.course, user=self.other_student, kind=Membership.KIND_STUDENT
+        )
+        self.url = reverse("ohq:question-list", args=[self.course.id, self.queue.id])
+
+    def ask(self, user):
+        self.client.force_authenticate(user=user)
+        self.client.post(self.url, {"text": "Help me", "tags": []})
+
+    def test_shared(self, mock_delay, mock_on_commit):
+        self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        with CaptureQueriesContext(connection) as miss:
+            first = self.client.get(self.url)
+        self.client.force_authenticate(user=self.ta2)
+        with CaptureQueriesContext(connection) as hit:
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual("application/json", second["Content-Type"])
+        self.assertLess(len(hit), len(miss))
+
+        questions = annotate_positions(Question.objects.filter(queue=self.queue))
+        self.assertEqual(
+            camelize(QuestionSerializer(questions, many=True).data), json.loads(second.content)
+        )
+
+    def test_indent(self, mock_delay, mock_on_commit):
+        """
+        Indented lists aren't shared with TAs that asked for the default rendering.
+        """
+
+        self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        indented = self.client.get(self.url, HTTP_ACCEPT="application/json; indent=4")
+        self.assertIn(b"\n    ", indented.content)
+        self.client.force_authenticate(user=self.ta2)
+        plain = self.client.get(self.url)
+        self.assertNotIn(b"\n", plain.content)
+        self.assertEqual(json.loads(indented.content), json.loads(plain.content))
+
+    def test_write(self, mock_delay, mock_on_commit):
+        self.ask(self.student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.get(self.url)
+        self.ask(self.other_student)
+        self.client.force_authenticate(user=self.ta)
+        self.assertEqual(2, len(json.loads(self.client.get(self.url).content)))
+
+    def test_student(self, mock_delay, mock_on_commit):
+        self.ask(self.student)
+        self.ask(self.other_student)
+        self.client.force_authenticate(user=self.ta)
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(1, len(json.loads(self.client.get(self.url).content)))
+
+
+@patch("ohq.serializers.sendUpNextNotificationTask.delay")
+class QueuePageTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.rate_limited_queue = Queue.objects.create(
+            name="Rate Limited Queue",
+            course=self.course,
+            rate_limit_enabled=True,
+            rate_limit_length=0,
+            rate_limit_minutes=20,
+            rate_limit_questions=1,
+        )
+        self.ta = User.objects.create(username="ta")
+        self.student = User.objects.create(username="student")
+        self.other_student = User.objects.create(username="other_student")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        Membership.objects.create(
+            course=self.course, user=self.student, kind=Membership.KIND_STUDENT
+        )
+        Membership.objects.create(
+            course=self.course, user=self.other_student, kind=Membership.KIND_STUDENT
+        )
+        Tag.objects.create(name="Tag", course=self.course)
+        Announcement.objects.create(content="Announcement", author=self.ta, course=self.course)
+
+        # The other student is ahead of the student in the first queue
+        Question.objects.create(queue=self.queue, asked_by=self.other_student, text="Help me")
+        self.question = Question.objects.create(
+            queue=self.queue, asked_by=self.student, text="Help me"
+        )
+        self.last_question = Question.objects.create(
+            queue=self.rate_limited_queue,
+            asked_by=self.student,
+            text="Help me",
+            status=Question.STATUS_ANSWERED,
+            time_responded_to=timezone.now() - timedelta(minutes=5),
+        )
+        self.url = reverse("ohq:course-queue-page", args=[self.course.id])
+        self.client.force_authenticate(user=self.student)
+
+    def test_queue_page(self, mock_delay):
+        response = self.client.get(self.url)
+        self.assertEqual(200, response.status_code)
+        page = json.loads(response.content)
+        self.assertEqual(
+            [self.queue.id, self.rate_limited_queue.id], [queue["id"] for queue in page["queues"]]
+        )
+        self.assertEqual(2, page["queues"][0]["questionsAsked"])
+        self.assertEqual([self.question.id], [question["id"] for question in page["questions"]])
+        self.assertEqual(2, page["questions"][0]["position"])
+        self.assertEqual(
+            [self.last_question.id], [question["id"] for question in page["lastQuestions"]]
+        )
+        self.assertEqual(["Tag"], [tag["name"] for tag in page["tags"]])
+        self.assertEqual(["Announcement"], [a["content"] for a in page["announcements"]])
+
+        quota = json.loads(
+            self.client.get(
+                reverse(
+                    "ohq:question-quota-count", args=[self.course.id, self.rate_limited_queue.id]
+                )
+            ).content
+        )
+        self.assertEqual(
+            [
+                {
+                    "queue": self.rate_limited_queue.id,
+                    "count": quota["count"],
+                    "waitTimeMins": quota["wait_time_mins"],
+                }
+            ],
+            page["quotas"],
+        )
+
+    def test_fixed_queries(self, mock_delay):
+        # Warm the tag cache
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        for i in range(3):
+            queue = Queue.objects.create(
+                name=f"Queue {i}",
+                course=self.course,
+                rate_limit_enabled=True,
+                rate_limit_length=0,
+                rate_limit_minutes=10,
+                rate_limit_questions=1,
+            )
+            Question.objects.create(queue=queue, asked_by=self.student, text="Help me")
+        with self.assertNumQueries(len(context)):
+            self.client.get(self.url)
+
+
+class QuestionPositionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.semester = Semester.objects.create(year=2020, term=Semester.TERM_FALL)
+        self.course = Course.objects.create(
+            course_code="000", department="Test Class", semester=self.semester
+        )
+        self.queue = Queue.objects.create(name="Queue", course=self.course)
+        self.ta = User.objects.create(username="ta")
+        Membership.objects.create(course=self.course, user=self.ta, kind=Membership.KIND_TA)
+        self.students = []
+        self.questions = []
+        for i in range(4):
+            student = User.objects.create(username=f"student{i}")
+            Membership.objects.create(
+                course=self.course, user=student, kind=Membership.KIND_STUDENT
+            )
+            question = Question.objects.create(queue=self.queue, asked_by=student, text="Help me")
+            question.time_asked = timezone.now() - timedelta(minutes=10 - i)
+            question.save()
+            self.students.append(student)
+            self.questions.append(question)
+        self.questions[1].status = Question.STATUS_ACTIVE
+        self.questions[1].save()
+        self.url = reverse("ohq:question-list", args=[self.course.id, self.queue.id])
+
+    def test_staff(self):
+        self.client.force_authenticate(user=self.ta)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(
+            [1, -1, 2, 3], [question["position"] for question in json.loads(response.content)]
+        )
+        self.assertTrue(any("ROW_NUMBER()" in query["sql"] for query in context.captured_queries))
+
+    def test_student(self):
+        self.client.force_authenticate(user=self.students[3])
+        response = self.client.get(self.url)
+        self.assertEqual([3], [question["position"] for question in json.loads(response.content)])
+        response = self.client.get(
+            reverse(
+                "ohq:question-position", args=[self.course.id, self.queue.id, self.questions[3].id]
+            )
+        )
+        self.assertEqual(3, json.loads(response.content)["position"])